@@ -1,9 +1,13 @@
 from fastapi import HTTPException, Security, Depends, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, APIKeyHeader
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Optional, Dict, Any
+from collections import OrderedDict
 import jwt
 import secrets
+import hashlib
+import threading
+import time
 import os
 import logging
 from functools import wraps
@@ -15,7 +19,14 @@ logger = logging.getLogger(__name__)
 # Configurações de segurança
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "hebrew-greek-tts-secret-key-change-in-production")
 ALGORITHM = "HS256"
+_SECRET_KEY_BYTES = SECRET_KEY.encode("utf-8")  # preparado uma vez para o HMAC
+_ALGORITHMS = [ALGORITHM]
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("TOKEN_EXPIRE_MINUTES", "60"))
+ACCESS_TOKEN_EXPIRE_SECONDS = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+# Cache de tokens já verificados (evita HMAC + consulta ao banco a cada request)
+TOKEN_CACHE_TTL = int(os.getenv("JWT_CACHE_TTL", "30"))              # segundos
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("JWT_CACHE_MAX_SIZE", "10000"))
 
 # Exportar para que outros módulos possam usar
 __all__ = [
@@ -24,6 +35,7 @@ __all__ = [
     'get_rate_limited_user',
     'create_access_token',
     'revoke_token',
+    'get_client_ip',
     'AuthenticationError',
     'PermissionError',
     'ACCESS_TOKEN_EXPIRE_MINUTES'  # Adicionar à exportação
@@ -33,6 +45,11 @@ __all__ = [
 security_bearer = HTTPBearer(auto_error=False)
 security_api_key = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+# Chave = hash do token (não guardamos o token em memória); valor = (expira_em, payload)
+_token_cache: "OrderedDict[bytes, tuple[float, Dict[str, Any]]]" = OrderedDict()
+_token_cache_by_jti: Dict[str, bytes] = {}
+_token_cache_lock = threading.Lock()
+
 class AuthenticationError(HTTPException):
     def __init__(self, detail: str = "Authentication failed"):
         super().__init__(
@@ -52,21 +69,23 @@ def create_access_token(user_data: Dict[str, Any], expires_delta: Optional[timed
     """Cria token JWT e registra sessão no banco"""
     to_encode = user_data.copy()
     
+    # Claims em segundos (epoch) - mesmo formato que o JWT serializa
+    now = int(time.time())
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = now + ACCESS_TOKEN_EXPIRE_SECONDS
     
     # Gerar JTI único para o token
-    jti = secrets.token_urlsafe(32)
+    jti = secrets.token_hex(16)
     
     to_encode.update({
         "exp": expire,
         "jti": jti,
-        "iat": datetime.utcnow()
+        "iat": now
     })
     
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _SECRET_KEY_BYTES, algorithm=ALGORITHM)
     
     # Registrar sessão no banco
     if 'user_id' in user_data:
@@ -78,28 +97,91 @@ def create_access_token(user_data: Dict[str, Any], expires_delta: Optional[timed
     
     return encoded_jwt, jti
 
+def _token_cache_key(token: str) -> bytes:
+    """Hash curto do token para indexar o cache"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def _cache_verified_token(key: bytes, payload: Dict[str, Any]):
+    """Guarda payload válido no cache, respeitando o 'exp' do token"""
+    now = time.time()
+    expires_at = now + TOKEN_CACHE_TTL
+    if payload.get('exp'):
+        expires_at = min(expires_at, float(payload['exp']))
+    if expires_at <= now:
+        return
+    
+    jti = payload.get('jti')
+    with _token_cache_lock:
+        _token_cache[key] = (expires_at, payload)
+        _token_cache.move_to_end(key)
+        if jti:
+            _token_cache_by_jti[jti] = key
+        
+        # Limitar tamanho (remove os menos usados recentemente)
+        while len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+            _, (_, old_payload) = _token_cache.popitem(last=False)
+            _token_cache_by_jti.pop(old_payload.get('jti'), None)
+
+def _invalidate_cached_token(jti: str):
+    """Remove do cache o token associado ao JTI"""
+    with _token_cache_lock:
+        key = _token_cache_by_jti.pop(jti, None)
+        if key is not None:
+            _token_cache.pop(key, None)
+
 def verify_token(token: str) -> Dict[str, Any]:
     """Verifica e decodifica token JWT"""
+    key = _token_cache_key(token)
+    
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+        if cached:
+            if cached[0] > time.time():
+                _token_cache.move_to_end(key)
+            else:
+                # Expirado no cache: descartar e verificar novamente
+                del _token_cache[key]
+                _token_cache_by_jti.pop(cached[1].get('jti'), None)
+                cached = None
+    
+    if cached:
+        # Revogação checada também no hit (conjunto em memória): um logout entre a
+        # checagem e a inserção no cache não deixa o payload válido até o TTL
+        jti = cached[1].get('jti')
+        if jti and db_manager.is_token_revoked(jti):
+            _invalidate_cached_token(jti)
+            raise AuthenticationError("Token has been revoked")
+        return cached[1]
+    
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, _SECRET_KEY_BYTES, algorithms=_ALGORITHMS)
         
-        # Verificar se token não foi revogado
+        # Verificar se token não foi revogado (conjunto em memória, sem ir ao banco)
         jti = payload.get('jti')
-        if jti and not db_manager.is_token_valid(jti):
+        if jti and db_manager.is_token_revoked(jti):
             raise AuthenticationError("Token has been revoked")
         
+        _cache_verified_token(key, payload)
         return payload
     except jwt.ExpiredSignatureError:
         raise AuthenticationError("Token expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise AuthenticationError("Invalid token")
 
 def get_client_ip(request: Request) -> str:
-    """Obtém IP do cliente"""
+    """Obtém IP do cliente (calculado uma vez por request)"""
+    ip = getattr(request.state, "client_ip", None)
+    if ip is not None:
+        return ip
+    
     forwarded_for = request.headers.get("X-Forwarded-For")
     if forwarded_for:
-        return forwarded_for.split(",")[0].strip()
-    return request.client.host if request.client else "unknown"
+        ip = forwarded_for.split(",")[0].strip()
+    else:
+        ip = request.client.host if request.client else "unknown"
+    
+    request.state.client_ip = ip
+    return ip
 
 def get_current_user(
     request: Request,
@@ -109,7 +191,6 @@ def get_current_user(
     """Obtém usuário atual via JWT ou API Key"""
     
     ip_address = get_client_ip(request)
-    user_agent = request.headers.get("User-Agent", "unknown")
     
     # Tentar autenticação via API Key primeiro
     if api_key:
@@ -189,4 +270,5 @@ async def get_rate_limited_user(request: Request, current_user: dict = Depends(g
 
 def revoke_token(jti: str):
     """Revoga token JWT"""
-    db_manager.revoke_token(jti)
\ No newline at end of file
+    db_manager.revoke_token(jti)
+    _invalidate_cached_token(jti)
\ No newline at end of file
@@ -1,11 +1,20 @@
 import sqlite3
 import hashlib
+import hmac
 import secrets
+import struct
 import json
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime
 from typing import Optional, Dict, Any, List
 import logging
+import threading
+import atexit
+import queue
+import time
 import os
+from contextlib import contextmanager
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
@@ -13,151 +22,517 @@ logger = logging.getLogger(__name__)
 DB_PATH = os.getenv("DATABASE_PATH", "/app/data/tts_auth.db")
 DB_DIR = os.path.dirname(DB_PATH)
 
-class DatabaseManager:
-    def __init__(self, db_path: str = DB_PATH):
+# Custo do PBKDF2-HMAC-SHA256 (alterar invalida as senhas já gravadas)
+PBKDF2_ITERATIONS = 100_000
+
+# Versão do schema (PRAGMA user_version); incrementar ao alterar tabelas/índices
+SCHEMA_VERSION = 3
+
+# Gravação de sessões JWT em lote, fora do caminho do /auth/login
+ASYNC_SESSION_WRITES = os.getenv("ASYNC_SESSION_WRITES", "true").lower() == "true"
+FLUSH_INTERVAL_SECONDS = 0.05
+# Lote que falha repetidamente: espera crescente entre tentativas e descarte após o limite
+FLUSH_MAX_BACKOFF_SECONDS = 30
+FLUSH_MAX_ATTEMPTS = 5
+
+# Contadores de rate limit: "memory" (processo único, sem I/O) ou "sqlite" (compartilhado)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+
+# Cache de API keys verificadas (evita SELECT por requisição para clientes recorrentes)
+API_KEY_CACHE_TTL = 30          # segundos
+API_KEY_CACHE_MAX_SIZE = 4096
+
+# Entradas do cache TTS mantidas em memória (hit sem consulta ao banco)
+TTS_ENTRY_CACHE_MAX_SIZE = int(os.getenv("TTS_ENTRY_CACHE_MAX_SIZE", "10000"))
+
+# Pool de conexões reutilizáveis (evita connect/close e mantém o page cache quente)
+POOL_SIZE = max(1, int(os.getenv("DB_POOL_SIZE", "8")))
+POOL_TIMEOUT_SECONDS = 10
+# Statements preparados mantidos por conexão (o cache do sqlite3 é indexado pelo texto SQL)
+STATEMENT_CACHE_SIZE = 256
+
+# SQL do caminho quente (auth, rate limit, cache): texto idêntico a cada chamada
+_SQL_AUTH_USER = '''
+    SELECT id, username, email, password_hash, salt, permissions, is_active, is_admin, rate_limit
+    FROM users WHERE username = ? AND is_active = 1
+'''
+_SQL_VERIFY_KEY = '''
+    SELECT id, name, permissions, rate_limit, is_active, expires_at, usage_count
+    FROM api_keys
+    WHERE key_hash = ? AND is_active = 1
+'''
+_SQL_TOUCH_KEYS = '''
+    UPDATE api_keys
+    SET usage_count = usage_count + ?, last_used = ?
+    WHERE id = ?
+'''
+_SQL_INSERT_SESSIONS = '''
+    INSERT OR IGNORE INTO sessions (user_id, token_jti, expires_at, user_agent, ip_address)
+    VALUES (?, ?, ?, ?, ?)
+'''
+_SQL_INSERT_AUDIT = '''
+    INSERT INTO audit_logs (user_id, api_key_id, action, resource, ip_address, success, details, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_TOKEN_VALID = '''
+    SELECT id FROM sessions
+    WHERE token_jti = ? AND is_revoked = 0 AND expires_at > ?
+'''
+_SQL_RATE_LIMIT_INCR = '''
+    INSERT INTO rate_limits (identifier, request_count, bucket)
+    VALUES (?, 1, ?)
+    ON CONFLICT(identifier, bucket)
+    DO UPDATE SET request_count = request_count + 1
+    WHERE request_count < ?
+    RETURNING request_count
+'''
+_SQL_RATE_LIMIT_GET = '''
+    SELECT request_count FROM rate_limits
+    WHERE identifier = ? AND bucket = ?
+'''
+_SQL_CACHE_LOOKUP = '''
+    SELECT id, file_path, file_size, hit_count FROM tts_cache
+    WHERE text_hash = ? AND lang = ? AND model = ? AND speed = ?
+'''
+
+_SQL_TOUCH_CACHE = '''
+    UPDATE tts_cache
+    SET hit_count = hit_count + ?, last_accessed = ?
+    WHERE id = ?
+'''
+
+
+@lru_cache(maxsize=256)
+def _parse_permissions(permissions_json: str) -> tuple:
+    """Decodifica a coluna permissions (poucos valores distintos: parse uma vez por texto)"""
+    return tuple(json.loads(permissions_json))
+
+
+class ConnectionPool:
+    """Pool simples de conexões SQLite, criadas sob demanda até `size`"""
+    
+    def __init__(self, db_path: str, size: int = POOL_SIZE):
         self.db_path = db_path
-        # Criar diretório se não existir
-        os.makedirs(DB_DIR, exist_ok=True)
-        self.init_database()
-    
-    def get_connection(self):
-        """Cria conexão com o banco"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Para acessar colunas por nome
+        self.size = size
+        self._idle: queue.Queue = queue.Queue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+        # Escritor único (SQLite: um escritor, vários leitores)
+        self._writer_conn: Optional[sqlite3.Connection] = None
+        self._writer_lock = threading.RLock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        # PRAGMAs por conexão (não persistem no arquivo)
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Seguro com WAL: 1 fsync por checkpoint
+        conn.execute("PRAGMA cache_size=-64000")   # ~64MB de page cache
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")  # Leituras via mmap (até 256MB), sem read() por página
+        conn.execute("PRAGMA foreign_keys=ON")
         return conn
     
+    def _get(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        
+        if create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        
+        try:
+            return self._idle.get(timeout=POOL_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Timed out waiting for a database connection")
+    
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    @contextmanager
+    def acquire(self, row_factory=None):
+        """Empresta uma conexão; commit ao sair, rollback em caso de erro.
+        
+        Linhas são tuplas por padrão; use row_factory=sqlite3.Row onde as
+        colunas são acessadas por nome.
+        """
+        conn = self._get()
+        conn.row_factory = row_factory
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                # Conexão em estado inválido: descartar em vez de devolver ao pool
+                self._discard(conn)
+                raise
+            conn.row_factory = None
+            self._idle.put(conn)
+            raise
+        else:
+            conn.row_factory = None
+            self._idle.put(conn)
+    
+    @contextmanager
+    def writer(self, row_factory=None):
+        """Conexão única de escrita, serializada por lock, em BEGIN IMMEDIATE.
+        
+        Uso aninhado na mesma thread participa da transação externa.
+        """
+        with self._writer_lock:
+            if self._writer_conn is None:
+                self._writer_conn = self._connect()
+                self._writer_conn.isolation_level = None  # Transações explícitas
+            conn = self._writer_conn
+            
+            if conn.in_transaction:
+                previous_factory = conn.row_factory
+                conn.row_factory = row_factory
+                try:
+                    yield conn
+                finally:
+                    conn.row_factory = previous_factory
+                return
+            
+            conn.row_factory = row_factory
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                if conn.in_transaction:
+                    conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.row_factory = None
+    
+    def close(self):
+        """Fecha as conexões ociosas"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+class DatabaseManager:
+    def __init__(self, db_path: str = DB_PATH, init: bool = True):
+        self.db_path = db_path
+        # Escritas pendentes, gravadas em lote pela thread de background
+        self._pending_sessions: Dict[str, tuple] = {}
+        self._pending_audit: List[tuple] = []
+        self._pending_key_usage: Dict[int, list] = {}  # api_key_id -> [usos, último uso]
+        self._pending_cache_hits: Dict[int, list] = {}  # tts_cache.id -> [hits, último acesso]
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        self._flush_event = threading.Event()
+        self._flush_failures = 0
+        # JTIs revogados ainda não expirados (consulta em memória, sem ir ao banco)
+        self._revoked_jtis: set = set()
+        # Rate limit em memória: identifier -> [bucket, contagem]
+        self._rate_counters: Dict[str, list] = {}
+        self._rate_lock = threading.Lock()
+        # API keys verificadas: key_hash -> (expira_em, dados)
+        self._api_key_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._api_key_cache_lock = threading.Lock()
+        # Incrementado por revoke_api_key: leitura feita antes de uma revogação não entra no cache
+        self._api_key_generation = 0
+        # Entradas do cache TTS: text_hash -> [id, file_path, file_size, hit_count]
+        self._tts_entries: "OrderedDict[str, list]" = OrderedDict()
+        self._tts_entries_lock = threading.Lock()
+        # Incrementado a cada mudança em usuários/API keys/cache (invalida caches de estatísticas)
+        self.stats_version = 0
+        self.pool = ConnectionPool(db_path)
+        # Schema criado em init() (startup da aplicação), não no import do módulo
+        self._ready = False
+        self._initializing = False
+        self._init_lock = threading.RLock()
+        if init:
+            self.init()
+    
+    def get_connection(self, row_factory=None):
+        """Empresta uma conexão do pool (usar com `with`)"""
+        if not self._ready:
+            self.init()
+        return self.pool.acquire(row_factory)
+    
+    def write_connection(self, row_factory=None):
+        """Conexão de escrita serializada (usar com `with`)"""
+        if not self._ready:
+            self.init()
+        return self.pool.writer(row_factory)
+    
+    def init(self):
+        """Prepara o banco (uma vez por processo; chamado no startup ou no primeiro uso)"""
+        if self._ready:
+            return
+        with self._init_lock:
+            # Reentrada pela própria inicialização (mesma thread): seguir sem bloquear
+            if self._ready or self._initializing:
+                return
+            self._initializing = True
+            try:
+                # Criar diretório se não existir
+                os.makedirs(DB_DIR, exist_ok=True)
+                self.init_database()
+                self._ready = True
+            finally:
+                self._initializing = False
+    
     def init_database(self):
         """Inicializa o banco de dados com as tabelas"""
         with self.get_connection() as conn:
-            # Tabela de usuários
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    email TEXT UNIQUE,
-                    password_hash TEXT NOT NULL,
-                    salt TEXT NOT NULL,
-                    permissions TEXT NOT NULL DEFAULT '["tts", "models"]',
-                    is_active BOOLEAN DEFAULT 1,
-                    is_admin BOOLEAN DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_login TIMESTAMP,
-                    rate_limit INTEGER DEFAULT 100
-                )
-            ''')
-            
-            # Tabela de API Keys
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS api_keys (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    key_hash TEXT UNIQUE NOT NULL,
-                    key_prefix TEXT NOT NULL,
-                    name TEXT NOT NULL,
-                    permissions TEXT NOT NULL DEFAULT '["tts", "models"]',
-                    rate_limit INTEGER DEFAULT 100,
-                    is_active BOOLEAN DEFAULT 1,
-                    created_by INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    expires_at TIMESTAMP,
-                    last_used TIMESTAMP,
-                    usage_count INTEGER DEFAULT 0,
-                    FOREIGN KEY (created_by) REFERENCES users (id)
-                )
-            ''')
-            
-            # Tabela de sessions/tokens JWT
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    token_jti TEXT UNIQUE NOT NULL,
-                    issued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    expires_at TIMESTAMP NOT NULL,
-                    is_revoked BOOLEAN DEFAULT 0,
-                    user_agent TEXT,
-                    ip_address TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-            
-            # Tabela de rate limiting
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS rate_limits (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    identifier TEXT NOT NULL,
-                    request_count INTEGER DEFAULT 1,
-                    window_start TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(identifier, window_start)
-                )
-            ''')
-            
-            # Tabela de logs de auditoria
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS audit_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    api_key_id INTEGER,
-                    action TEXT NOT NULL,
-                    resource TEXT,
-                    ip_address TEXT,
-                    user_agent TEXT,
-                    success BOOLEAN DEFAULT 1,
-                    details TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id),
-                    FOREIGN KEY (api_key_id) REFERENCES api_keys (id)
-                )
-            ''')
-            
-            # Tabela de cache TTS
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS tts_cache (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    text_hash TEXT NOT NULL,
-                    text TEXT NOT NULL,
-                    lang TEXT NOT NULL,
-                    model TEXT NOT NULL,
-                    speed REAL NOT NULL,
-                    file_path TEXT NOT NULL,
-                    file_size INTEGER NOT NULL,
-                    hit_count INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(text_hash, lang, model, speed)
-                )
-            ''')
-            
-            # Tabela de cache de alinhamento de palavras
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS tts_alignment_cache (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    cache_id INTEGER NOT NULL,
-                    words_json TEXT NOT NULL,
-                    alignment_model TEXT NOT NULL DEFAULT 'faster-whisper-tiny',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (cache_id) REFERENCES tts_cache (id) ON DELETE CASCADE,
-                    UNIQUE(cache_id)
-                )
-            ''')
-            
-            # Índices para melhor performance
-            conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_tts_cache_hash 
-                ON tts_cache(text_hash, lang, model, speed)
-            ''')
-            
-            conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_tts_cache_hit_count 
-                ON tts_cache(hit_count)
-            ''')
-            
-            conn.execute('''
-                CREATE INDEX IF NOT EXISTS idx_alignment_cache_id 
-                ON tts_alignment_cache(cache_id)
-            ''')
-            
-            conn.commit()
-            logger.info(f"Database initialized at {self.db_path}")
+            # Schema já na versão atual: pular CREATE/migrações
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self._create_schema(conn)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                conn.commit()
+                logger.info(f"Database initialized at {self.db_path}")
+        
+        self._load_revoked_tokens()
+    
+    def _create_schema(self, conn: sqlite3.Connection):
+        """Cria tabelas, índices e triggers e aplica migrações"""
+        # Vacuum incremental: páginas livres são devolvidas aos poucos por vacuum_tick()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            has_tables = conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone()
+            if has_tables:
+                # Banco existente: o modo só passa a valer após um VACUUM completo (uma vez)
+                logger.info("Converting database to incremental auto_vacuum (one-time VACUUM)")
+                conn.execute("VACUUM")
+        
+        # WAL é persistente no arquivo: leitores não bloqueiam o escritor
+        conn.execute("PRAGMA journal_mode=WAL")
+        
+        # Tabela de usuários
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                email TEXT UNIQUE,
+                password_hash TEXT NOT NULL,
+                salt TEXT NOT NULL,
+                permissions TEXT NOT NULL DEFAULT '["tts", "models"]',
+                is_active BOOLEAN DEFAULT 1,
+                is_admin BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_login TIMESTAMP,
+                rate_limit INTEGER DEFAULT 100
+            )
+        ''')
+        
+        # Tabela de API Keys
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS api_keys (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key_hash TEXT UNIQUE NOT NULL,
+                key_prefix TEXT NOT NULL,
+                name TEXT NOT NULL,
+                permissions TEXT NOT NULL DEFAULT '["tts", "models"]',
+                rate_limit INTEGER DEFAULT 100,
+                is_active BOOLEAN DEFAULT 1,
+                created_by INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                expires_at INTEGER,  -- epoch segundos (UTC)
+                last_used TIMESTAMP,
+                usage_count INTEGER DEFAULT 0,
+                FOREIGN KEY (created_by) REFERENCES users (id)
+            )
+        ''')
+        
+        # Tabela de sessions/tokens JWT
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                token_jti TEXT UNIQUE NOT NULL,
+                issued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                expires_at INTEGER NOT NULL,  -- epoch segundos (UTC)
+                is_revoked BOOLEAN DEFAULT 0,
+                user_agent TEXT,
+                ip_address TEXT,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        
+        # Migração: expires_at em texto (datetime) -> epoch segundos
+        conn.execute('''
+            UPDATE sessions SET expires_at = CAST(strftime('%s', expires_at) AS INTEGER)
+            WHERE typeof(expires_at) = 'text'
+        ''')
+        # API keys antigas gravavam horário local
+        conn.execute('''
+            UPDATE api_keys SET expires_at = CAST(strftime('%s', expires_at, 'utc') AS INTEGER)
+            WHERE typeof(expires_at) = 'text'
+        ''')
+        
+        # Tabela de rate limiting
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                identifier TEXT NOT NULL,
+                request_count INTEGER DEFAULT 1,
+                bucket INTEGER NOT NULL,
+                UNIQUE(identifier, bucket)
+            )
+        ''')
+        
+        # Migração: window_start -> bucket (início da janela em epoch segundos)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(rate_limits)")]
+        if 'window_start' in columns:
+            conn.execute("DELETE FROM rate_limits")  # Contadores antigos são descartáveis
+            conn.execute("ALTER TABLE rate_limits RENAME COLUMN window_start TO bucket")
+        
+        # Tabela de logs de auditoria
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS audit_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                api_key_id INTEGER,
+                action TEXT NOT NULL,
+                resource TEXT,
+                ip_address TEXT,
+                user_agent TEXT,
+                success BOOLEAN DEFAULT 1,
+                details TEXT,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id),
+                FOREIGN KEY (api_key_id) REFERENCES api_keys (id)
+            )
+        ''')
+        
+        # Tabela de cache TTS
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS tts_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text_hash TEXT NOT NULL,
+                text TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                model TEXT NOT NULL,
+                speed REAL NOT NULL,
+                file_path TEXT NOT NULL,
+                file_size INTEGER NOT NULL,
+                hit_count INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(text_hash, lang, model, speed)
+            )
+        ''')
+        
+        # Tamanho total do cache mantido por triggers (evita SUM(file_size) a cada consulta)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS cache_meta (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_size INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        conn.execute('''
+            INSERT OR IGNORE INTO cache_meta (id, total_size)
+            SELECT 1, COALESCE(SUM(file_size), 0) FROM tts_cache
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_tts_cache_size_insert
+            AFTER INSERT ON tts_cache
+            BEGIN
+                UPDATE cache_meta SET total_size = total_size + NEW.file_size WHERE id = 1;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_tts_cache_size_delete
+            AFTER DELETE ON tts_cache
+            BEGIN
+                UPDATE cache_meta SET total_size = total_size - OLD.file_size WHERE id = 1;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_tts_cache_size_update
+            AFTER UPDATE OF file_size ON tts_cache
+            BEGIN
+                UPDATE cache_meta SET total_size = total_size - OLD.file_size + NEW.file_size WHERE id = 1;
+            END
+        ''')
+        
+        # Tabela de cache de alinhamento de palavras
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS tts_alignment_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cache_id INTEGER NOT NULL,
+                words_json TEXT NOT NULL,
+                alignment_model TEXT NOT NULL DEFAULT 'faster-whisper-tiny',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (cache_id) REFERENCES tts_cache (id) ON DELETE CASCADE,
+                UNIQUE(cache_id)
+            )
+        ''')
+        
+        # Índices para melhor performance
+        # (text_hash, lang, model, speed) já é coberto pelo índice do UNIQUE
+        conn.execute('DROP INDEX IF EXISTS idx_tts_cache_hash')
+        
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_tts_cache_hit_count 
+            ON tts_cache(hit_count)
+        ''')
+        
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_alignment_cache_id 
+            ON tts_alignment_cache(cache_id)
+        ''')
+        
+        # get_user_stats: WHERE user_id = ? AND action IN (...) + MAX(timestamp)
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_audit_user_action
+            ON audit_logs(user_id, action, timestamp)
+        ''')
+        
+        # Atividade recente do /admin/system-info: range em timestamp, action coberto pelo índice
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_audit_ts_action ON audit_logs(timestamp, action)')
+        
+        # Contagens do /admin (usuários/keys ativos, sessões válidas) direto do índice
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_users_active ON users(is_active)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_keys_active ON api_keys(is_active)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_live ON sessions(is_revoked, expires_at)')
+        
+        # Estatísticas do planner (coletadas uma vez; depois atualizadas por optimize())
+        has_stats = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        ).fetchone()
+        if not has_stats:
+            conn.execute('ANALYZE')
+    
+    def vacuum_tick(self, pages: int = 1000):
+        """Devolve até `pages` páginas livres ao sistema (vacuum incremental)"""
+        with self.write_connection() as conn:
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    
+    def optimize(self):
+        """Atualiza estatísticas do planner quando necessário (barato)"""
+        with self.write_connection() as conn:
+            conn.execute("PRAGMA optimize").fetchall()
     
     def hash_password(self, password: str) -> tuple[str, str]:
         """Gera hash seguro da senha"""
@@ -165,16 +540,20 @@ class DatabaseManager:
         password_hash = hashlib.pbkdf2_hmac('sha256', 
                                           password.encode('utf-8'), 
                                           salt.encode('utf-8'), 
-                                          100000)
+                                          PBKDF2_ITERATIONS)
         return password_hash.hex(), salt
     
     def verify_password(self, password: str, password_hash: str, salt: str) -> bool:
-        """Verifica senha"""
+        """Verifica senha (comparação em tempo constante)"""
         test_hash = hashlib.pbkdf2_hmac('sha256',
                                        password.encode('utf-8'),
                                        salt.encode('utf-8'),
-                                       100000)
-        return test_hash.hex() == password_hash
+                                       PBKDF2_ITERATIONS)
+        try:
+            expected = bytes.fromhex(password_hash)
+        except ValueError:
+            return False
+        return hmac.compare_digest(test_hash, expected)
     
     def create_user(self, username: str, password: str, email: str = None, 
                    permissions: List[str] = None, is_admin: bool = False,
@@ -183,7 +562,7 @@ class DatabaseManager:
         password_hash, salt = self.hash_password(password)
         permissions = permissions or ["tts", "models"]
         
-        with self.get_connection() as conn:
+        with self.write_connection() as conn:
             cursor = conn.execute('''
                 INSERT INTO users (username, email, password_hash, salt, permissions, is_admin, rate_limit)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -197,58 +576,49 @@ class DatabaseManager:
                 VALUES (?, 'user_created', ?)
             ''', (user_id, f"User {username} created"))
             
-            conn.commit()
             logger.info(f"User created: {username} (ID: {user_id})")
-            return user_id
+        
+        self.stats_version += 1
+        return user_id
     
     def authenticate_user(self, username: str, password: str, ip_address: str = None) -> Optional[Dict]:
         """Autentica usuário"""
         with self.get_connection() as conn:
-            cursor = conn.execute('''
-                SELECT id, username, email, password_hash, salt, permissions, is_active, is_admin, rate_limit
-                FROM users WHERE username = ? AND is_active = 1
-            ''', (username,))
-            
-            user = cursor.fetchone()
-            if not user:
-                # Log tentativa falhada
-                conn.execute('''
-                    INSERT INTO audit_logs (action, resource, ip_address, success, details)
-                    VALUES ('login_attempt', ?, ?, 0, 'User not found')
-                ''', (username, ip_address))
-                conn.commit()
-                return None
-            
-            if not self.verify_password(password, user['password_hash'], user['salt']):
-                # Log senha incorreta
-                conn.execute('''
-                    INSERT INTO audit_logs (user_id, action, ip_address, success, details)
-                    VALUES (?, 'login_attempt', ?, 0, 'Invalid password')
-                ''', (user['id'], ip_address))
-                conn.commit()
-                return None
-            
+            user = conn.execute(_SQL_AUTH_USER, (username,)).fetchone()
+        
+        if not user:
+            # Log tentativa falhada
+            self.log_audit('login_attempt', resource=username, ip_address=ip_address,
+                           success=False, details='User not found')
+            return None
+        
+        # PBKDF2 (~100k iterações) fora da conexão: não segura o pool durante o hash
+        user_id, username, email, password_hash, salt, permissions, _, is_admin, rate_limit = user
+        
+        if not self.verify_password(password, password_hash, salt):
+            # Log senha incorreta
+            self.log_audit('login_attempt', user_id=user_id, ip_address=ip_address,
+                           success=False, details='Invalid password')
+            return None
+        
+        with self.write_connection() as conn:
             # Atualizar último login
             conn.execute('''
                 UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?
-            ''', (user['id'],))
-            
-            # Log login bem-sucedido
-            conn.execute('''
-                INSERT INTO audit_logs (user_id, action, ip_address, success, details)
-                VALUES (?, 'login_success', ?, 1, 'User authenticated')
-            ''', (user['id'], ip_address))
-            
-            conn.commit()
-            
-            return {
-                'id': user['id'],
-                'username': user['username'],
-                'email': user['email'],
-                'permissions': json.loads(user['permissions']),
-                'is_admin': bool(user['is_admin']),
-                'rate_limit': user['rate_limit']
-            }
+            ''', (user_id,))
+        
+        # Log login bem-sucedido
+        self.log_audit('login_success', user_id=user_id, ip_address=ip_address,
+                       details='User authenticated')
+        
+        return {
+            'id': user_id,
+            'username': username,
+            'email': email,
+            'permissions': list(_parse_permissions(permissions)),
+            'is_admin': bool(is_admin),
+            'rate_limit': rate_limit
+        }
     
     def create_api_key(self, name: str, permissions: List[str] = None, 
                       rate_limit: int = 100, expires_days: int = None,
@@ -262,9 +632,9 @@ class DatabaseManager:
         permissions = permissions or ["tts", "models"]
         expires_at = None
         if expires_days:
-            expires_at = datetime.now() + timedelta(days=expires_days)
+            expires_at = int(time.time()) + expires_days * 86400
         
-        with self.get_connection() as conn:
+        with self.write_connection() as conn:
             cursor = conn.execute('''
                 INSERT INTO api_keys (key_hash, key_prefix, name, permissions, rate_limit, 
                                     created_by, expires_at)
@@ -280,132 +650,310 @@ class DatabaseManager:
                 VALUES (?, ?, 'api_key_created', ?)
             ''', (created_by, api_key_id, f"API key {name} created"))
             
-            conn.commit()
             logger.info(f"API key created: {name} (ID: {api_key_id})")
-            
+        
+        self.stats_version += 1
         return api_key
     
     def verify_api_key(self, api_key: str, ip_address: str = None) -> Optional[Dict]:
         """Verifica API key"""
         key_hash = hashlib.sha256(api_key.encode()).hexdigest()
         
+        api_key_info = self._get_cached_api_key(key_hash)
+        if api_key_info is not None:
+            self._record_api_key_use(api_key_info['id'], ip_address)
+            return dict(api_key_info, permissions=list(api_key_info['permissions']))
+        
+        generation = self._api_key_generation
         with self.get_connection() as conn:
-            cursor = conn.execute('''
-                SELECT id, name, permissions, rate_limit, is_active, expires_at, usage_count
-                FROM api_keys 
-                WHERE key_hash = ? AND is_active = 1
-            ''', (key_hash,))
-            
+            cursor = conn.execute(_SQL_VERIFY_KEY, (key_hash,))
             api_key_data = cursor.fetchone()
-            if not api_key_data:
-                # Log tentativa falhada
-                conn.execute('''
-                    INSERT INTO audit_logs (action, resource, ip_address, success, details)
-                    VALUES ('api_key_attempt', ?, ?, 0, 'Invalid API key')
-                ''', (api_key[:8], ip_address))
-                conn.commit()
+        
+        if not api_key_data:
+            # Log tentativa falhada
+            self.log_audit('api_key_attempt', resource=api_key[:8], ip_address=ip_address,
+                           success=False, details='Invalid API key')
+            return None
+        
+        api_key_id, name, permissions, rate_limit, _, key_expires_at, usage_count = api_key_data
+        
+        # Verificar expiração (epoch segundos: comparação de inteiros, sem parse)
+        if key_expires_at is not None and key_expires_at <= time.time():
+            self.log_audit('api_key_attempt', api_key_id=api_key_id,
+                           ip_address=ip_address, success=False, details='API key expired')
+            return None
+        
+        api_key_info = {
+            'id': api_key_id,
+            'name': name,
+            'permissions': list(_parse_permissions(permissions)),
+            'rate_limit': rate_limit,
+            'usage_count': usage_count
+        }
+        self._cache_api_key(key_hash, api_key_info, key_expires_at, generation)
+        self._record_api_key_use(api_key_info['id'], ip_address)
+        return dict(api_key_info, permissions=list(api_key_info['permissions']))
+    
+    def _record_api_key_use(self, api_key_id: int, ip_address: str = None):
+        """Acumula estatísticas de uso (gravadas em lote) e registra auditoria"""
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        with self._pending_lock:
+            usage = self._pending_key_usage.get(api_key_id)
+            if usage is None:
+                self._pending_key_usage[api_key_id] = [1, now]
+            else:
+                usage[0] += 1
+                usage[1] = now
+        
+        # Log uso bem-sucedido
+        self.log_audit('api_key_used', api_key_id=api_key_id, ip_address=ip_address,
+                       details='API key authenticated')
+    
+    def _get_cached_api_key(self, key_hash: str) -> Optional[Dict]:
+        with self._api_key_cache_lock:
+            cached = self._api_key_cache.get(key_hash)
+            if cached is None:
                 return None
-            
-            # Verificar expiração
-            if api_key_data['expires_at']:
-                expires_at = datetime.fromisoformat(api_key_data['expires_at'])
-                if datetime.now() > expires_at:
-                    conn.execute('''
-                        INSERT INTO audit_logs (api_key_id, action, ip_address, success, details)
-                        VALUES (?, 'api_key_attempt', ?, 0, 'API key expired')
-                    ''', (api_key_data['id'], ip_address))
-                    conn.commit()
-                    return None
-            
-            # Atualizar estatísticas de uso
-            conn.execute('''
-                UPDATE api_keys 
-                SET last_used = CURRENT_TIMESTAMP, usage_count = usage_count + 1
-                WHERE id = ?
-            ''', (api_key_data['id'],))
-            
-            # Log uso bem-sucedido
-            conn.execute('''
-                INSERT INTO audit_logs (api_key_id, action, ip_address, success, details)
-                VALUES (?, 'api_key_used', ?, 1, 'API key authenticated')
-            ''', (api_key_data['id'], ip_address))
-            
-            conn.commit()
-            
-            return {
-                'id': api_key_data['id'],
-                'name': api_key_data['name'],
-                'permissions': json.loads(api_key_data['permissions']),
-                'rate_limit': api_key_data['rate_limit'],
-                'usage_count': api_key_data['usage_count']
-            }
+            if cached[0] <= time.time():
+                del self._api_key_cache[key_hash]
+                return None
+            self._api_key_cache.move_to_end(key_hash)
+            return cached[1]
     
-    def create_session(self, user_id: int, token_jti: str, expires_at: datetime,
-                      user_agent: str = None, ip_address: str = None) -> int:
-        """Cria sessão para JWT token"""
-        with self.get_connection() as conn:
-            cursor = conn.execute('''
-                INSERT INTO sessions (user_id, token_jti, expires_at, user_agent, ip_address)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, token_jti, expires_at, user_agent, ip_address))
+    def _cache_api_key(self, key_hash: str, api_key_info: Dict, key_expires_at: Optional[float],
+                       generation: int):
+        """Guarda API key válida no cache, respeitando a expiração da própria chave.
+        
+        generation é o valor de _api_key_generation lido antes do SELECT: se alguma
+        key foi revogada desde então, a linha pode estar velha e não é guardada.
+        """
+        expires_at = time.time() + API_KEY_CACHE_TTL
+        if key_expires_at is not None:
+            expires_at = min(expires_at, key_expires_at)
+        
+        with self._api_key_cache_lock:
+            if generation != self._api_key_generation:
+                return
+            self._api_key_cache[key_hash] = (expires_at, api_key_info)
+            self._api_key_cache.move_to_end(key_hash)
+            while len(self._api_key_cache) > API_KEY_CACHE_MAX_SIZE:
+                self._api_key_cache.popitem(last=False)
+    
+    def revoke_api_key(self, api_key_id: int):
+        """Revoga API key e remove do cache"""
+        with self.write_connection() as conn:
+            conn.execute("UPDATE api_keys SET is_active = 0 WHERE id = ?", (api_key_id,))
+        self.stats_version += 1
+        
+        with self._api_key_cache_lock:
+            self._api_key_generation += 1
+            stale = [key for key, (_, info) in self._api_key_cache.items() if info['id'] == api_key_id]
+            for key in stale:
+                del self._api_key_cache[key]
+    
+    def create_session(self, user_id: int, token_jti: str, expires_at: int,
+                      user_agent: str = None, ip_address: str = None):
+        """Cria sessão para JWT token (gravada em lote pela thread de background)"""
+        row = (user_id, token_jti, expires_at, user_agent, ip_address)
+        
+        if not ASYNC_SESSION_WRITES:
+            self._insert_sessions([row])
+            return
+        
+        with self._pending_lock:
+            self._pending_sessions[token_jti] = row
+        self._wake_flusher()
+    
+    def _insert_sessions(self, rows: List[tuple]):
+        """Grava várias sessões em uma única transação"""
+        with self.write_connection() as conn:
+            conn.executemany(_SQL_INSERT_SESSIONS, rows)
+    
+    def log_audit(self, action: str, user_id: int = None, api_key_id: int = None,
+                  resource: str = None, ip_address: str = None, success: bool = True,
+                  details: str = None):
+        """Enfileira evento de auditoria (gravado em lote pela thread de background)"""
+        # Horário do evento, não do flush (mesmo formato UTC de CURRENT_TIMESTAMP)
+        timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        row = (user_id, api_key_id, action, resource, ip_address, int(success), details, timestamp)
+        
+        with self._pending_lock:
+            self._pending_audit.append(row)
+        self._wake_flusher()
+    
+    def _wake_flusher(self):
+        """Avisa a thread de gravação (iniciada uma vez) que há escritas pendentes"""
+        if self._flusher is None:
+            with self._pending_lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, name="db-flusher", daemon=True)
+                    self._flusher.start()
+                    atexit.register(self.flush_pending_writes)
+        self._flush_event.set()
+    
+    def _flush_loop(self):
+        while True:
+            # Dorme até haver escrita pendente; a janela curta agrupa as que chegarem juntas
+            self._flush_event.wait()
+            time.sleep(FLUSH_INTERVAL_SECONDS)
+            self._flush_event.clear()
+            try:
+                self.flush_pending_writes()
+            except Exception as e:
+                delay = min(FLUSH_MAX_BACKOFF_SECONDS, 2 ** (self._flush_failures - 1))
+                logger.error(f"Error flushing pending writes (attempt {self._flush_failures}, "
+                             f"retrying in {delay:.1f}s): {e}")
+                time.sleep(delay)
+                self._flush_event.set()
+    
+    def flush_pending_writes(self):
+        """Grava no banco tudo que está pendente em memória"""
+        with self._flush_lock:
+            with self._pending_lock:
+                rows = list(self._pending_sessions.values())
+                audit_rows, self._pending_audit = self._pending_audit, []
+                key_usage, self._pending_key_usage = self._pending_key_usage, {}
+                cache_hits, self._pending_cache_hits = self._pending_cache_hits, {}
+            if not rows and not audit_rows and not key_usage and not cache_hits:
+                return
             
-            session_id = cursor.lastrowid
-            conn.commit()
-            return session_id
+            try:
+                # Sessões, auditoria, uso de API keys e hits do cache na mesma transação
+                with self.write_connection() as conn:
+                    if rows:
+                        conn.executemany(_SQL_INSERT_SESSIONS, rows)
+                    if audit_rows:
+                        conn.executemany(_SQL_INSERT_AUDIT, audit_rows)
+                    if key_usage:
+                        conn.executemany(_SQL_TOUCH_KEYS, [
+                            (count, last_used, api_key_id)
+                            for api_key_id, (count, last_used) in key_usage.items()
+                        ])
+                    if cache_hits:
+                        conn.executemany(_SQL_TOUCH_CACHE, [
+                            (count, last_accessed, cache_id)
+                            for cache_id, (count, last_accessed) in cache_hits.items()
+                        ])
+            except Exception as e:
+                self._flush_failures += 1
+                if self._flush_failures >= FLUSH_MAX_ATTEMPTS:
+                    # Lote envenenado (ex.: FK violada): descartar em vez de acumular para sempre
+                    self._flush_failures = 0
+                    with self._pending_lock:
+                        for row in rows:
+                            self._pending_sessions.pop(row[1], None)
+                    logger.error(
+                        f"Dropping pending writes after {FLUSH_MAX_ATTEMPTS} failed attempts "
+                        f"({len(rows)} sessions, {len(audit_rows)} audit rows, "
+                        f"{len(key_usage)} key usage, {len(cache_hits)} cache hits): {e}"
+                    )
+                    return
+                # Devolver auditoria e contadores para a próxima tentativa
+                with self._pending_lock:
+                    self._pending_audit[:0] = audit_rows
+                    for api_key_id, (count, last_used) in key_usage.items():
+                        usage = self._pending_key_usage.setdefault(api_key_id, [0, last_used])
+                        usage[0] += count
+                    for cache_id, (count, last_accessed) in cache_hits.items():
+                        hits = self._pending_cache_hits.setdefault(cache_id, [0, last_accessed])
+                        hits[0] += count
+                raise
+            
+            self._flush_failures = 0
+            # Só sai da fila depois de gravado (is_token_valid continua enxergando)
+            with self._pending_lock:
+                for row in rows:
+                    self._pending_sessions.pop(row[1], None)
     
     def is_token_valid(self, token_jti: str) -> bool:
         """Verifica se token JWT é válido"""
+        with self._pending_lock:
+            pending = self._pending_sessions.get(token_jti)
+        if pending is not None:
+            return pending[2] > time.time()
+        
         with self.get_connection() as conn:
-            cursor = conn.execute('''
-                SELECT id FROM sessions 
-                WHERE token_jti = ? AND is_revoked = 0 AND expires_at > CURRENT_TIMESTAMP
-            ''', (token_jti,))
-            
+            cursor = conn.execute(_SQL_TOKEN_VALID, (token_jti, int(time.time())))
+
             return cursor.fetchone() is not None
     
+    def is_token_revoked(self, token_jti: str) -> bool:
+        """Verifica revogação apenas em memória (sem consulta ao banco)"""
+        return token_jti in self._revoked_jtis
+    
+    def _load_revoked_tokens(self):
+        """Carrega JTIs revogados que ainda não expiraram"""
+        with self.get_connection() as conn:
+            rows = conn.execute('''
+                SELECT token_jti FROM sessions
+                WHERE is_revoked = 1 AND expires_at > ?
+            ''', (int(time.time()),)).fetchall()
+        # Troca atômica do conjunto (leitores nunca veem conjunto parcial)
+        self._revoked_jtis = {row[0] for row in rows}
+    
     def revoke_token(self, token_jti: str):
         """Revoga token JWT"""
-        with self.get_connection() as conn:
+        # Garantir que a sessão já exista no banco antes de revogar
+        if token_jti in self._pending_sessions:
+            self.flush_pending_writes()
+        
+        with self.write_connection() as conn:
             conn.execute('''
                 UPDATE sessions SET is_revoked = 1 WHERE token_jti = ?
             ''', (token_jti,))
-            conn.commit()
+        
+        # Recarregar do banco também descarta revogações já expiradas
+        self._load_revoked_tokens()
+        self._revoked_jtis.add(token_jti)
     
     def check_rate_limit(self, identifier: str, limit: int, window_minutes: int = 60) -> tuple[bool, int]:
-        """Verifica rate limit"""
-        window_start = datetime.now() - timedelta(minutes=window_minutes)
+        """Verifica rate limit (contador por janela fixa, incrementado atomicamente)"""
+        if limit <= 0:
+            return False, 0
         
-        with self.get_connection() as conn:
-            # Limpar entradas antigas
-            conn.execute('''
-                DELETE FROM rate_limits WHERE window_start < ?
-            ''', (window_start,))
-            
-            # Contar requests na janela atual
-            cursor = conn.execute('''
-                SELECT COALESCE(SUM(request_count), 0) as total
-                FROM rate_limits 
-                WHERE identifier = ? AND window_start >= ?
-            ''', (identifier, window_start))
-            
-            current_count = cursor.fetchone()['total']
+        # Bucket = início da janela atual em epoch segundos (chave "identifier:bucket" com INCR)
+        window_seconds = window_minutes * 60
+        bucket = int(time.time()) // window_seconds * window_seconds
+        
+        if RATE_LIMIT_BACKEND == "memory":
+            with self._rate_lock:
+                counter = self._rate_counters.get(identifier)
+                if counter is None or counter[0] != bucket:
+                    counter = self._rate_counters[identifier] = [bucket, 0]
+                if counter[1] >= limit:
+                    return False, counter[1]
+                counter[1] += 1
+                return True, counter[1]
+        
+        with self.write_connection() as conn:
+            # Incrementa somente se ainda estiver abaixo do limite (check + incremento atômicos)
+            row = conn.execute(_SQL_RATE_LIMIT_INCR, (identifier, bucket, limit)).fetchone()
             
-            if current_count >= limit:
+            if row is None:
+                # Limite atingido: nada foi incrementado
+                current_count = conn.execute(_SQL_RATE_LIMIT_GET, (identifier, bucket)).fetchone()[0]
                 return False, current_count
             
-            # Incrementar contador
-            hour_key = datetime.now().strftime("%Y-%m-%d-%H")
-            conn.execute('''
-                INSERT OR REPLACE INTO rate_limits (identifier, request_count, window_start)
-                VALUES (?, COALESCE((SELECT request_count FROM rate_limits WHERE identifier = ? AND window_start = ?), 0) + 1, ?)
-            ''', (f"{identifier}:{hour_key}", f"{identifier}:{hour_key}", hour_key, hour_key))
-            
-            conn.commit()
-            return True, current_count + 1
+            return True, row[0]
+    
+    def cleanup_rate_limits(self, max_age_minutes: int = 60) -> int:
+        """Remove contadores de janelas já encerradas (executado periodicamente)"""
+        cutoff = int(time.time()) - max_age_minutes * 60
+        
+        if RATE_LIMIT_BACKEND == "memory":
+            with self._rate_lock:
+                expired = [key for key, (bucket, _) in self._rate_counters.items() if bucket < cutoff]
+                for key in expired:
+                    del self._rate_counters[key]
+            return len(expired)
+        
+        with self.write_connection() as conn:
+            cursor = conn.execute('DELETE FROM rate_limits WHERE bucket < ?', (cutoff,))
+            return cursor.rowcount
     
     def get_user_stats(self, user_id: int) -> Dict:
         """Estatísticas do usuário"""
-        with self.get_connection() as conn:
+        with self.get_connection(row_factory=sqlite3.Row) as conn:
             cursor = conn.execute('''
                 SELECT 
                     COUNT(*) as login_count,
@@ -420,64 +968,137 @@ class DatabaseManager:
                 'last_activity': stats['last_activity']
             }
     
+    def compute_cache_key(self, text: str, lang: str, model: str, speed: float) -> str:
+        """Chave do cache TTS (BLAKE2b-128: não é segredo, só precisa ser rápida e sem colisões)"""
+        # Campos direto no hasher, separados por \x1f (sem montar string intermediária)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(text.encode('utf-8'))
+        h.update(b'\x1f')
+        h.update(lang.encode('utf-8'))
+        h.update(b'\x1f')
+        h.update(model.encode('utf-8'))
+        h.update(b'\x1f')
+        h.update(struct.pack('<d', speed))
+        return h.hexdigest()
+    
     def get_cache_entry(self, text: str, lang: str, model: str, speed: float) -> Optional[Dict]:
-        """Busca entrada no cache"""
-        text_hash = hashlib.sha256(f"{text}{lang}{model}{speed}".encode()).hexdigest()
+        """Busca entrada no cache (memória e, se preciso, SELECT no pool de leitura)"""
+        text_hash = self.compute_cache_key(text, lang, model, speed)
+        entry = self.peek_cache_entry(text_hash)
+        if entry is not None:
+            return entry
         
+        # Sem checar o arquivo aqui: quem abre o arquivo trata FileNotFoundError
+        # e chama invalidate_cache_entry()
         with self.get_connection() as conn:
-            cursor = conn.execute('''
-                SELECT id, file_path, file_size, hit_count
-                FROM tts_cache 
-                WHERE text_hash = ? AND lang = ? AND model = ? AND speed = ?
-            ''', (text_hash, lang, model, speed))
-            
-            entry = cursor.fetchone()
-            if entry:
-                # Verificar se arquivo ainda existe
-                if os.path.exists(entry['file_path']):
-                    # Incrementar hit_count e atualizar last_accessed
-                    conn.execute('''
-                        UPDATE tts_cache 
-                        SET hit_count = hit_count + 1, last_accessed = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    ''', (entry['id'],))
-                    conn.commit()
-                    
-                    logger.info(f"Cache HIT: {text[:50]}... (hits: {entry['hit_count'] + 1})")
-                    return {
-                        'id': entry['id'],
-                        'file_path': entry['file_path'],
-                        'file_size': entry['file_size'],
-                        'hit_count': entry['hit_count'] + 1
-                    }
-                else:
-                    # Arquivo não existe mais, remover do cache
-                    conn.execute('DELETE FROM tts_cache WHERE id = ?', (entry['id'],))
-                    conn.commit()
-                    logger.warning(f"Cache entry removed (file not found): {entry['file_path']}")
-            
+            row = conn.execute(_SQL_CACHE_LOOKUP, (text_hash, lang, model, speed)).fetchone()
+        if not row:
             return None
+        
+        cache_id, file_path, file_size, hit_count = row
+        self._remember_cache_entry(text_hash, (cache_id, file_path, file_size, hit_count + 1))
+        self._count_cache_hit(cache_id)
+        logger.debug("Cache HIT: %.50s... (hits: %d)", text, hit_count + 1)
+        return {
+            'id': cache_id,
+            'file_path': file_path,
+            'file_size': file_size,
+            'hit_count': hit_count + 1
+        }
+    
+    def peek_cache_entry(self, text_hash: str) -> Optional[Dict]:
+        """Busca só no cache em memória (sem SQLite); o hit é gravado em lote pelo flusher"""
+        with self._tts_entries_lock:
+            cached = self._tts_entries.get(text_hash)
+            if not cached:
+                return None
+            self._tts_entries.move_to_end(text_hash)
+            cached[3] += 1
+            cache_id, file_path, file_size, hit_count = cached
+        self._count_cache_hit(cache_id)
+        return {
+            'id': cache_id,
+            'file_path': file_path,
+            'file_size': file_size,
+            'hit_count': hit_count
+        }
+    
+    def _count_cache_hit(self, cache_id: int):
+        """Enfileira o incremento de hit_count/last_accessed para o flusher"""
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        with self._pending_lock:
+            hits = self._pending_cache_hits.get(cache_id)
+            if hits:
+                hits[0] += 1
+                hits[1] = now
+            else:
+                self._pending_cache_hits[cache_id] = [1, now]
+        self._wake_flusher()
+    
+    def _remember_cache_entry(self, text_hash: str, entry: tuple):
+        """Guarda a entrada no cache em memória (LRU limitado)"""
+        with self._tts_entries_lock:
+            self._tts_entries[text_hash] = list(entry)
+            self._tts_entries.move_to_end(text_hash)
+            while len(self._tts_entries) > TTS_ENTRY_CACHE_MAX_SIZE:
+                self._tts_entries.popitem(last=False)
+    
+    def _forget_cache_entries(self, cache_ids=None):
+        """Remove entradas do cache em memória (todas se cache_ids for None)"""
+        with self._tts_entries_lock:
+            if cache_ids is None:
+                self._tts_entries.clear()
+                return
+            cache_ids = set(cache_ids)
+            stale = [key for key, entry in self._tts_entries.items() if entry[0] in cache_ids]
+            for key in stale:
+                del self._tts_entries[key]
+    
+    def invalidate_cache_entry(self, cache_id: int):
+        """Remove entrada do cache cujo arquivo não existe mais"""
+        self._forget_cache_entries((cache_id,))
+        with self.write_connection() as conn:
+            conn.execute('DELETE FROM tts_cache WHERE id = ?', (cache_id,))
+        logger.warning(f"Cache entry {cache_id} removed (file not found)")
+    
+    def clear_cache(self) -> List[str]:
+        """Remove todas as entradas do cache TTS e retorna os caminhos dos arquivos"""
+        with self.write_connection() as conn:
+            file_paths = [row[0] for row in conn.execute('SELECT file_path FROM tts_cache')]
+            conn.execute('DELETE FROM tts_cache')
+        self._forget_cache_entries()
+        self.stats_version += 1
+        return file_paths
     
     def save_cache_entry(self, text: str, lang: str, model: str, speed: float, 
-                        file_path: str, file_size: int) -> int:
-        """Salva entrada no cache"""
-        text_hash = hashlib.sha256(f"{text}{lang}{model}{speed}".encode()).hexdigest()
+                        file_path: str, file_size: int, text_hash: str = None) -> int:
+        """Salva entrada no cache (text_hash: chave já calculada com compute_cache_key)"""
+        if text_hash is None:
+            text_hash = self.compute_cache_key(text, lang, model, speed)
         
-        with self.get_connection() as conn:
-            cursor = conn.execute('''
-                INSERT OR REPLACE INTO tts_cache 
+        with self.write_connection() as conn:
+            # UPSERT em vez de INSERT OR REPLACE: o DELETE implícito do REPLACE
+            # não dispara os triggers de tamanho do cache
+            cache_id = conn.execute('''
+                INSERT INTO tts_cache 
                 (text_hash, text, lang, model, speed, file_path, file_size, hit_count)
                 VALUES (?, ?, ?, ?, ?, ?, ?, 0)
-            ''', (text_hash, text, lang, model, speed, file_path, file_size))
-            
-            cache_id = cursor.lastrowid
-            conn.commit()
-            logger.info(f"Cache saved: {text[:50]}... -> {file_path}")
-            return cache_id
+                ON CONFLICT(text_hash, lang, model, speed) DO UPDATE SET
+                    text = excluded.text,
+                    file_path = excluded.file_path,
+                    file_size = excluded.file_size,
+                    hit_count = 0,
+                    created_at = CURRENT_TIMESTAMP,
+                    last_accessed = CURRENT_TIMESTAMP
+                RETURNING id
+            ''', (text_hash, text, lang, model, speed, file_path, file_size)).fetchone()[0]
+        self._remember_cache_entry(text_hash, (cache_id, file_path, file_size, 0))
+        logger.info(f"Cache saved: {text[:50]}... -> {file_path}")
+        return cache_id
     
     def get_alignment_cache(self, cache_id: int) -> Optional[Dict]:
         """Busca alinhamento de palavras do cache"""
-        with self.get_connection() as conn:
+        with self.get_connection(row_factory=sqlite3.Row) as conn:
             cursor = conn.execute('''
                 SELECT words_json, alignment_model, created_at
                 FROM tts_alignment_cache
@@ -496,7 +1117,7 @@ class DatabaseManager:
     def save_alignment_cache(self, cache_id: int, words: List[Dict], 
                             alignment_model: str = 'faster-whisper-tiny') -> int:
         """Salva alinhamento de palavras no cache"""
-        with self.get_connection() as conn:
+        with self.write_connection() as conn:
             cursor = conn.execute('''
                 INSERT OR REPLACE INTO tts_alignment_cache
                 (cache_id, words_json, alignment_model)
@@ -504,15 +1125,14 @@ class DatabaseManager:
             ''', (cache_id, json.dumps(words, ensure_ascii=False), alignment_model))
             
             alignment_id = cursor.lastrowid
-            conn.commit()
             logger.info(f"Alignment cache saved for cache_id {cache_id}: {len(words)} words")
             return alignment_id
     
     def get_cache_size(self) -> int:
         """Retorna tamanho total do cache em bytes"""
         with self.get_connection() as conn:
-            cursor = conn.execute('SELECT COALESCE(SUM(file_size), 0) as total FROM tts_cache')
-            return cursor.fetchone()['total']
+            cursor = conn.execute('SELECT total_size FROM cache_meta WHERE id = 1')
+            return cursor.fetchone()[0]
     
     def cleanup_cache(self, max_size_mb: int = 100) -> Dict:
         """Remove entradas menos acessadas quando cache ultrapassa o limite"""
@@ -529,50 +1149,56 @@ class DatabaseManager:
         
         logger.info(f"Cache cleanup triggered: {current_size / (1024*1024):.2f}MB > {max_size_mb}MB")
         
-        with self.get_connection() as conn:
-            # Buscar entradas menos acessadas
+        with self.write_connection(row_factory=sqlite3.Row) as conn:
+            # Entradas menos acessadas até voltar abaixo do limite (soma acumulada em uma query)
             entries = conn.execute('''
+                WITH ranked AS (
+                    SELECT id, file_path, file_size, hit_count,
+                           SUM(file_size) OVER (
+                               ORDER BY hit_count ASC, last_accessed ASC
+                               ROWS UNBOUNDED PRECEDING
+                           ) AS cumulative
+                    FROM tts_cache
+                )
                 SELECT id, file_path, file_size, hit_count
-                FROM tts_cache 
-                ORDER BY hit_count ASC, last_accessed ASC
-            ''').fetchall()
-            
-            removed_count = 0
-            freed_size = 0
-            
-            for entry in entries:
-                if current_size - freed_size <= max_size_bytes:
-                    break
-                
-                # Deletar arquivo
-                if os.path.exists(entry['file_path']):
-                    try:
-                        os.remove(entry['file_path'])
-                        logger.info(f"Removed cache file: {entry['file_path']} (hits: {entry['hit_count']})")
-                    except Exception as e:
-                        logger.error(f"Error removing cache file: {e}")
-                
-                # Remover do banco
-                conn.execute('DELETE FROM tts_cache WHERE id = ?', (entry['id'],))
-                freed_size += entry['file_size']
-                removed_count += 1
-            
-            conn.commit()
+                FROM ranked
+                WHERE ? - cumulative + file_size > ?
+            ''', (current_size, max_size_bytes)).fetchall()
             
-            new_size = self.get_cache_size()
-            logger.info(f"Cache cleaned: removed {removed_count} entries, freed {freed_size / (1024*1024):.2f}MB")
-            
-            return {
-                'cleaned': True,
-                'current_size_mb': round(new_size / (1024 * 1024), 2),
-                'max_size_mb': max_size_mb,
-                'removed_count': removed_count,
-                'freed_mb': round(freed_size / (1024 * 1024), 2)
-            }
+            # Remover do banco em um único DELETE
+            removed_ids = [entry['id'] for entry in entries]
+            conn.execute(
+                'DELETE FROM tts_cache WHERE id IN (SELECT value FROM json_each(?))',
+                (json.dumps(removed_ids),)
+            )
+        self._forget_cache_entries(removed_ids)
+        
+        # Arquivos removidos depois do commit, sem segurar o lock do escritor
+        for entry in entries:
+            try:
+                os.unlink(entry['file_path'])
+                logger.info(f"Removed cache file: {entry['file_path']} (hits: {entry['hit_count']})")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Error removing cache file: {e}")
+        
+        removed_count = len(entries)
+        freed_size = sum(entry['file_size'] for entry in entries)
+        new_size = current_size - freed_size
+        logger.info(f"Cache cleaned: removed {removed_count} entries, freed {freed_size / (1024*1024):.2f}MB")
+        
+        return {
+            'cleaned': True,
+            'current_size_mb': round(new_size / (1024 * 1024), 2),
+            'max_size_mb': max_size_mb,
+            'removed_count': removed_count,
+            'freed_mb': round(freed_size / (1024 * 1024), 2)
+        }
     
     def get_cache_stats(self) -> Dict:
         """Retorna estatísticas do cache"""
-        with self.get_connection() as conn:
+        with self.get_connection(row_factory=sqlite3.Row) as conn:
             cursor = conn.execute('''
                 SELECT 
                     COUNT(*) as total_entries,
@@ -609,6 +1235,18 @@ class DatabaseManager:
                 } for entry in top_hits]
             }
     
+    @contextmanager
+    def _savepoint(self, conn: sqlite3.Connection, name: str = "seed_item"):
+        """SAVEPOINT dentro da transação atual (desfaz só este trecho em caso de erro)"""
+        conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            raise
+        conn.execute(f"RELEASE {name}")
+    
     def initialize_default_data(self):
         """Inicializa dados padrão usando variáveis de ambiente"""
         try:
@@ -636,86 +1274,93 @@ class DatabaseManager:
             
             results = {}
             
-            if create_default_users:
-                # Criar usuário admin
-                try:
-                    admin_id = self.create_user(
-                        username=admin_username,
-                        password=admin_password,
-                        email=admin_email,
-                        permissions=["*"],
-                        is_admin=True,
-                        rate_limit=admin_rate_limit
-                    )
-                    results["admin_user"] = {
-                        "id": admin_id,
-                        "username": admin_username,
-                        "email": admin_email,
-                        "credentials": f"{admin_username}/{admin_password}",
-                        "note": "CHANGE PASSWORD IN PRODUCTION!"
-                    }
-                    logger.info(f"Admin user created: {admin_username}")
-                except Exception as e:
-                    logger.warning(f"Admin user creation failed (may already exist): {e}")
-                    results["admin_user"] = {"error": str(e)}
+            # Tudo em uma única transação; cada item em um SAVEPOINT próprio para que
+            # uma falha esperada (ex.: usuário já existe) não desfaça os demais
+            with self.write_connection() as conn:
+                if create_default_users:
+                    # Criar usuário admin
+                    try:
+                        with self._savepoint(conn):
+                            admin_id = self.create_user(
+                                username=admin_username,
+                                password=admin_password,
+                                email=admin_email,
+                                permissions=["*"],
+                                is_admin=True,
+                                rate_limit=admin_rate_limit
+                            )
+                        results["admin_user"] = {
+                            "id": admin_id,
+                            "username": admin_username,
+                            "email": admin_email,
+                            "credentials": f"{admin_username}/{admin_password}",
+                            "note": "CHANGE PASSWORD IN PRODUCTION!"
+                        }
+                        logger.info(f"Admin user created: {admin_username}")
+                    except Exception as e:
+                        logger.warning(f"Admin user creation failed (may already exist): {e}")
+                        results["admin_user"] = {"error": str(e)}
+                    
+                    # Criar usuário demo
+                    try:
+                        with self._savepoint(conn):
+                            demo_id = self.create_user(
+                                username=demo_username,
+                                password=demo_password,
+                                email=demo_email,
+                                permissions=["tts", "models"],
+                                is_admin=False,
+                                rate_limit=demo_rate_limit
+                            )
+                        results["demo_user"] = {
+                            "id": demo_id,
+                            "username": demo_username,
+                            "email": demo_email,
+                            "credentials": f"{demo_username}/{demo_password}"
+                        }
+                        logger.info(f"Demo user created: {demo_username}")
+                    except Exception as e:
+                        logger.warning(f"Demo user creation failed (may already exist): {e}")
+                        results["demo_user"] = {"error": str(e)}
                 
-                # Criar usuário demo
-                try:
-                    demo_id = self.create_user(
-                        username=demo_username,
-                        password=demo_password,
-                        email=demo_email,
-                        permissions=["tts", "models"],
-                        is_admin=False,
-                        rate_limit=demo_rate_limit
-                    )
-                    results["demo_user"] = {
-                        "id": demo_id,
-                        "username": demo_username,
-                        "email": demo_email,
-                        "credentials": f"{demo_username}/{demo_password}"
-                    }
-                    logger.info(f"Demo user created: {demo_username}")
-                except Exception as e:
-                    logger.warning(f"Demo user creation failed (may already exist): {e}")
-                    results["demo_user"] = {"error": str(e)}
-            
-            # Criar API Keys se solicitado
-            if create_demo_api_key:
-                try:
-                    demo_key = self.create_api_key(
-                        name=demo_api_key_name,
-                        permissions=["tts", "models"],
-                        rate_limit=int(os.getenv("DEMO_API_KEY_RATE_LIMIT", "50"))
-                    )
-                    results["demo_api_key"] = {
-                        "key": demo_key,
-                        "name": demo_api_key_name,
-                        "permissions": ["tts", "models"],
-                        "usage": f"curl -H 'X-API-Key: {demo_key}' https://your-api.com/speak"
-                    }
-                    logger.info(f"Demo API Key created: {demo_api_key_name}")
-                except Exception as e:
-                    logger.warning(f"Demo API key creation failed: {e}")
-                    results["demo_api_key"] = {"error": str(e)}
-            
-            if create_admin_api_key:
-                try:
-                    admin_key = self.create_api_key(
-                        name=admin_api_key_name,
-                        permissions=["*"],
-                        rate_limit=int(os.getenv("ADMIN_API_KEY_RATE_LIMIT", "1000"))
-                    )
-                    results["admin_api_key"] = {
-                        "key": admin_key,
-                        "name": admin_api_key_name,
-                        "permissions": ["*"],
-                        "usage": f"curl -H 'X-API-Key: {admin_key}' https://your-api.com/admin/users"
-                    }
-                    logger.info(f"Admin API Key created: {admin_api_key_name}")
-                except Exception as e:
-                    logger.warning(f"Admin API key creation failed: {e}")
-                    results["admin_api_key"] = {"error": str(e)}
+                # Criar API Keys se solicitado
+                if create_demo_api_key:
+                    try:
+                        with self._savepoint(conn):
+                            demo_key = self.create_api_key(
+                                name=demo_api_key_name,
+                                permissions=["tts", "models"],
+                                rate_limit=int(os.getenv("DEMO_API_KEY_RATE_LIMIT", "50"))
+                            )
+                        results["demo_api_key"] = {
+                            "key": demo_key,
+                            "name": demo_api_key_name,
+                            "permissions": ["tts", "models"],
+                            "usage": f"curl -H 'X-API-Key: {demo_key}' https://your-api.com/speak"
+                        }
+                        logger.info(f"Demo API Key created: {demo_api_key_name}")
+                    except Exception as e:
+                        logger.warning(f"Demo API key creation failed: {e}")
+                        results["demo_api_key"] = {"error": str(e)}
+                
+                if create_admin_api_key:
+                    try:
+                        with self._savepoint(conn):
+                            admin_key = self.create_api_key(
+                                name=admin_api_key_name,
+                                permissions=["*"],
+                                rate_limit=int(os.getenv("ADMIN_API_KEY_RATE_LIMIT", "1000"))
+                            )
+                        results["admin_api_key"] = {
+                            "key": admin_key,
+                            "name": admin_api_key_name,
+                            "permissions": ["*"],
+                            "usage": f"curl -H 'X-API-Key: {admin_key}' https://your-api.com/admin/users"
+                        }
+                        logger.info(f"Admin API Key created: {admin_api_key_name}")
+                    except Exception as e:
+                        logger.warning(f"Admin API key creation failed: {e}")
+                        results["admin_api_key"] = {"error": str(e)}
             
             # Informações adicionais
             results["configuration"] = {
@@ -732,5 +1377,5 @@ class DatabaseManager:
             logger.error(f"Error during default data initialization: {e}")
             return {"error": str(e)}
 
-# Instância global do gerenciador
-db_manager = DatabaseManager()
\ No newline at end of file
+# Instância global do gerenciador (schema preparado por db_manager.init() no startup)
+db_manager = DatabaseManager(init=False)
\ No newline at end of file
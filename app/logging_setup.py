@@ -0,0 +1,61 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+# Diretório de logs (com fallback para quando não é possível criar)
+LOG_DIR = os.getenv("LOG_DIR", "/home/app/logs")
+# Nível do logger raiz (logs por requisição ficam em DEBUG)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Registros acumulados antes de escrever em disco (WARNING+ força o flush)
+LOG_BUFFER_CAPACITY = 100
+
+_listener = None
+
+def setup_logging(level=None):
+    """Configura o logging da aplicação uma única vez.
+
+    Os handlers da aplicação só enfileiram os registros; a escrita em disco e
+    no console acontece na thread do QueueListener, fora do caminho da requisição.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    handlers.append(stream_handler)
+
+    try:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        file_handler = logging.FileHandler(os.path.join(LOG_DIR, 'app.log'))
+        file_handler.setFormatter(formatter)
+        handlers.append(logging.handlers.MemoryHandler(
+            LOG_BUFFER_CAPACITY,
+            flushLevel=logging.WARNING,
+            target=file_handler
+        ))
+    except OSError as e:
+        file_error = e
+    else:
+        file_error = None
+
+    log_queue = queue.Queue(-1)
+    root = logging.getLogger()
+    root.setLevel(level or LOG_LEVEL)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    if file_error is not None:
+        # Só o StreamHandler ficou ativo: o aviso sai pelo próprio logging
+        logging.getLogger(__name__).warning(f"File logging disabled ({LOG_DIR}): {file_error}")
+    return _listener
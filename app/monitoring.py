@@ -2,38 +2,115 @@ import psutil
 import logging
 import time
 import os
+import threading
 from fastapi import APIRouter
 
-router = APIRouter()
+from .logging_setup import setup_logging
 
-# Configurar logging estruturado (com fallback para quando diretório não existe)
-log_dir = "/home/app/logs"
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir, exist_ok=True)
+router = APIRouter()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(log_dir, 'app.log')),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
+# Intervalo do amostrador de CPU em segundos
+CPU_SAMPLE_INTERVAL = float(os.getenv("CPU_SAMPLE_INTERVAL", "5"))
+
+# Últimas leituras do amostrador, protegidas por lock
+_samples = {"cpu_percent": 0.0, "memory_percent": 0.0, "disk_usage": 0.0}
+_samples_lock = threading.Lock()
+
+def _sample_system():
+    """Coleta CPU (delta desde a última chamada), memória e disco"""
+    sample = {
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "memory_percent": psutil.virtual_memory().percent,
+        "disk_usage": psutil.disk_usage('/').percent,
+    }
+    with _samples_lock:
+        _samples.update(sample)
+
+_sampler_stop = None
+_sampler_thread = None
+
+def _sampler_loop(stop):
+    while not stop.wait(CPU_SAMPLE_INTERVAL):
+        try:
+            _sample_system()
+        except Exception as e:
+            logger.error(f"Error sampling system metrics: {e}")
+
+# Valores constantes durante a vida do processo
+BOOT_TIME = psutil.boot_time()
+CPU_COUNT = psutil.cpu_count()
+
+# Cache curto das respostas (single-flight: scrapes concorrentes fazem uma só coleta)
+METRICS_TTL = float(os.getenv("METRICS_TTL", "3"))
+_response_cache = {}
+_response_cache_lock = threading.Lock()
+
+def _cached(key, build):
+    """Retorna o payload em cache ou o reconstrói se o TTL expirou"""
+    entry = _response_cache.get(key)
+    if entry and time.monotonic() - entry[0] < METRICS_TTL:
+        return entry[1]
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+        if entry and time.monotonic() - entry[0] < METRICS_TTL:
+            return entry[1]
+        payload = build()
+        _response_cache[key] = (time.monotonic(), payload)
+        return payload
+
+def _build_metrics():
+    with _samples_lock:
+        sample = dict(_samples)
+    return {
+        **sample,
+        "uptime": time.time() - BOOT_TIME,
+        "processes": len(psutil.pids()),
+        "status": "ok"
+    }
+
+def _build_health():
+    return {
+        "status": "healthy",
+        "timestamp": time.time(),
+        "system": {
+            "cpu_count": CPU_COUNT,
+            "memory_total": psutil.virtual_memory().total,
+            "disk_free": psutil.disk_usage('/').free
+        }
+    }
+
+@router.on_event("startup")
+def start_sampler():
+    """Inicia o amostrador no startup da aplicação (importar o módulo não cria threads)"""
+    global _sampler_thread, _sampler_stop
+    if _sampler_thread is not None:
+        return
+    # Primeira chamada só inicializa o contador de CPU (retorna 0.0)
+    psutil.cpu_percent(interval=None)
+    _sample_system()
+    _sampler_stop = threading.Event()
+    _sampler_thread = threading.Thread(
+        target=_sampler_loop, args=(_sampler_stop,), name="metrics-sampler", daemon=True
+    )
+    _sampler_thread.start()
+
+@router.on_event("shutdown")
+def stop_sampler():
+    global _sampler_thread
+    if _sampler_thread is None:
+        return
+    _sampler_stop.set()
+    _sampler_thread = None
+
 @router.get("/metrics")
 def get_metrics():
     """Métricas do sistema para monitoramento no Coolify"""
     try:
-        return {
-            "cpu_percent": psutil.cpu_percent(interval=1),
-            "memory_percent": psutil.virtual_memory().percent,
-            "disk_usage": psutil.disk_usage('/').percent,
-            "uptime": time.time() - psutil.boot_time(),
-            "processes": len(psutil.pids()),
-            "status": "ok"
-        }
+        return _cached("metrics", _build_metrics)
     except Exception as e:
         logger.error(f"Error getting metrics: {e}")
         return {
@@ -45,15 +122,7 @@ def get_metrics():
 def detailed_health():
     """Health check detalhado para debugging"""
     try:
-        return {
-            "status": "healthy",
-            "timestamp": time.time(),
-            "system": {
-                "cpu_count": psutil.cpu_count(),
-                "memory_total": psutil.virtual_memory().total,
-                "disk_free": psutil.disk_usage('/').free
-            }
-        }
+        return _cached("health", _build_health)
     except Exception as e:
         logger.error(f"Error in detailed health check: {e}")
         return {
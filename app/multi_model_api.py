@@ -2,27 +2,44 @@
 # IMPORTS PRINCIPAIS
 # ============================================
 from fastapi import FastAPI, Form, HTTPException, Depends, Request, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, Response
 from fastapi.security import HTTPBearer
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from apscheduler.schedulers.background import BackgroundScheduler
 
+# Compressão Brotli/Zstd (opcional; sem ela usa o GZipMiddleware do Starlette)
+try:
+    from starlette_compress import CompressMiddleware
+except ImportError:
+    CompressMiddleware = None
+
 # Imports para TTS
 from transformers import VitsModel, AutoTokenizer
 from accelerate import Accelerator
-from scipy.io.wavfile import write
 from pydub import AudioSegment
 
 # Imports padrão Python
 import torch
-import numpy as np
 import os
-import uuid
-import hashlib
+import importlib.util
+import sqlite3
 import logging  # ← IMPORTANTE: Este import estava faltando ou na posição errada
+import io
+import json
+import hashlib
+import shutil
+import subprocess
 import time
+import threading
+import queue
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
 
 # Importar sistema de autenticação
 from .auth import (
@@ -31,31 +48,44 @@ from .auth import (
     get_rate_limited_user,
     create_access_token,
     revoke_token,
+    get_client_ip,
     AuthenticationError,
     PermissionError,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from .database import db_manager
+from .logging_setup import setup_logging
 
-# Importar o router de monitoring
-try:
+# Importar o router de monitoring (opcional: depende do psutil).
+# Erros dentro do monitoring.py não são mais silenciados.
+monitoring_router = None
+if importlib.util.find_spec(".monitoring", __package__) and importlib.util.find_spec("psutil"):
     from .monitoring import router as monitoring_router
-except ImportError:
-    monitoring_router = None
 
 # ============================================
 # CONFIGURAÇÃO DE LOGGING (LOGO APÓS OS IMPORTS)
 # ============================================
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# Serialização JSON com orjson quando disponível
+try:
+    import orjson
+    DefaultResponse = ORJSONResponse
+    json_dumps = orjson.dumps
+except ImportError:
+    DefaultResponse = JSONResponse
+    def json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
 # ============================================
 # CONFIGURAÇÃO DA APLICAÇÃO
 # ============================================
 app = FastAPI(
     title="Hebrew & Greek TTS API (Authenticated)", 
     description="API especializada em TTS para Hebraico e Grego usando MMS-TTS com autenticação",
-    version="3.1.0"
+    version="3.1.0",
+    default_response_class=DefaultResponse
 )
 
 # ============================================
@@ -63,11 +93,32 @@ app = FastAPI(
 # ============================================
 
 # 1. GZip Middleware (deve ser adicionado PRIMEIRO)
-app.add_middleware(
-    GZipMiddleware, 
-    minimum_size=1000,  # Compactar apenas responses > 1KB
-    compresslevel=6     # Nível de compressão (1-9, 6 é bom equilíbrio)
-)
+class JSONGZipMiddleware(GZipMiddleware):
+    """GZip que não passa MP3 pelo zlib (áudio já é comprimido)"""
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path = scope["path"]
+            if path == "/speak" or path.startswith("/audio/"):
+                await self.app(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
+
+if CompressMiddleware is not None:
+    # Brotli/Zstd negociados pelo Accept-Encoding (gzip como fallback);
+    # só comprime content-types compressíveis, então o MP3 passa direto
+    app.add_middleware(
+        CompressMiddleware,
+        minimum_size=500,
+        zstd_level=3,
+        brotli_quality=4,
+        gzip_level=1
+    )
+else:
+    app.add_middleware(
+        JSONGZipMiddleware, 
+        minimum_size=1000,  # Compactar apenas responses > 1KB
+        compresslevel=1     # JSON pequeno: nível 1 comprime quase igual e custa bem menos CPU
+    )
 
 # 2. CORS Middleware (depois do GZip)
 app.add_middleware(
@@ -117,6 +168,107 @@ logger.info(f"Torch dtype: {torch_dtype}")
 MAX_LOADED_MODELS = int(os.getenv("MAX_LOADED_MODELS", "2"))
 logger.info(f"Max loaded models: {MAX_LOADED_MODELS}")
 
+# Limite de inferências simultâneas e threads do Torch por inferência,
+# para que requisições concorrentes não disputem os mesmos núcleos
+MAX_CONCURRENT_INFER = max(1, int(os.getenv("MAX_CONCURRENT_INFER", "2")))
+infer_semaphore = threading.BoundedSemaphore(MAX_CONCURRENT_INFER)
+
+# Forwards do mesmo modelo são serializados (lock do speaking_rate): o paralelismo
+# real é no máximo um forward por modelo carregado
+PARALLEL_FORWARDS = max(1, min(MAX_CONCURRENT_INFER, MAX_LOADED_MODELS))
+
+if not has_cuda:
+    # OMP_NUM_THREADS (definido nos Dockerfiles) tem precedência
+    torch_threads = int(os.getenv("TORCH_NUM_THREADS", os.getenv(
+        "OMP_NUM_THREADS", max(1, (os.cpu_count() or 1) // PARALLEL_FORWARDS)
+    )))
+    torch.set_num_threads(torch_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Só pode ser chamado antes de qualquer trabalho paralelo
+        pass
+    logger.info(f"Torch threads: {torch_threads} (parallel forwards: {PARALLEL_FORWARDS})")
+
+# BF16 na CPU (opcional): só com suporte do hardware (AVX-512 BF16 / AMX)
+def _cpu_supports_bf16():
+    try:
+        return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except Exception:
+        return False
+
+CPU_BF16 = (
+    not has_cuda
+    and os.getenv("TTS_CPU_BF16", "false").lower() == "true"
+    and _cpu_supports_bf16()
+)
+logger.info(f"CPU BF16 autocast: {CPU_BF16}")
+
+def inference_autocast():
+    """Contexto de autocast para o forward do TTS (no-op se BF16 desabilitado)"""
+    if CPU_BF16:
+        return torch.autocast("cpu", dtype=torch.bfloat16)
+    return nullcontext()
+
+# Quantização dinâmica int8 das camadas Linear na CPU (opt-in: TTS_QUANT=int8).
+# Conv1d não tem versão dinâmica; BF16 na CPU fica com o autocast (TTS_CPU_BF16),
+# já que o cast do modelo inteiro quebra as splines do VITS.
+TTS_QUANT_INT8 = not has_cuda and os.getenv("TTS_QUANT", "none").lower() == "int8"
+
+def quantize_model(model):
+    """Aplica quantize_dynamic (qint8) nas Linear; em caso de erro mantém o modelo FP32"""
+    try:
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    except Exception as e:
+        logger.warning(f"Dynamic int8 quantization failed, using FP32 model: {e}")
+        return model
+
+# torch.compile do modelo VITS (opt-in; o primeiro forward paga a compilação)
+TORCH_COMPILE = os.getenv("TORCH_COMPILE", "0") == "1" and hasattr(torch, "compile")
+
+def compile_model(model):
+    """Compila o modelo com torch.compile e faz um forward de aquecimento"""
+    try:
+        # fullgraph=False: o comprimento do áudio depende dos dados (duration predictor),
+        # então partes do grafo rodam em eager sem impedir a compilação do resto
+        compiled = torch.compile(model, mode="reduce-overhead", dynamic=True, fullgraph=False)
+        # Entrada fictícia: tamanho de texto varia, por isso dynamic=True
+        dummy = torch.ones((1, 8), dtype=torch.long, device=accelerator.device)
+        with torch.inference_mode(), inference_autocast():
+            compiled(input_ids=dummy, attention_mask=torch.ones_like(dummy))
+        return compiled
+    except Exception as e:
+        logger.warning(f"torch.compile failed, using eager model: {e}")
+        return model
+
+# Encoder MP3: lameenc no próprio processo; senão ffmpeg via pipe quando disponível
+try:
+    import lameenc
+except ImportError:
+    lameenc = None
+FFMPEG_BIN = shutil.which("ffmpeg")
+
+# Entrega dos MP3 pelo nginx (X-Accel-Redirect + sendfile) em vez de pelo Python.
+# Requer location interna no nginx, ex: location /protected/ { internal; alias /app/cache/; }
+X_ACCEL_ENABLED = os.getenv("X_ACCEL_ENABLED", "false").lower() == "true"
+X_ACCEL_PREFIX = os.getenv("X_ACCEL_PREFIX", "/protected/")
+
+# Diretório dos MP3 (criado uma vez em initialize_app)
+CACHE_DIR = os.path.join(os.getcwd(), "cache")
+
+# Fração mínima de memória livre antes de carregar um modelo (0 = desabilitado)
+MEMORY_FREE_THRESHOLD = float(os.getenv("MEMORY_FREE_THRESHOLD", "0"))
+
+# gc + torch.cuda.empty_cache após descarregar um modelo (fora do caminho da requisição)
+EMPTY_CACHE_ON_EVICT = os.getenv("EMPTY_CACHE_ON_EVICT", "0") == "1"
+
+def release_memory():
+    """Coleta lixo e devolve blocos livres do alocador CUDA"""
+    import gc
+    gc.collect()
+    if has_cuda:
+        torch.cuda.empty_cache()
+
 # Classe para rastrear uso dos modelos
 class ModelWrapper:
     def __init__(self, model, tokenizer):
@@ -129,8 +281,28 @@ class ModelWrapper:
         self.last_used = time.time()
         self.usage_count += 1
 
-# Modelos carregados dinamicamente
-models = {}
+# Modelos carregados dinamicamente (ordem LRU: o mais recente fica no fim)
+models = OrderedDict()
+
+# Locks por modelo: speaking_rate é atributo do modelo compartilhado entre requisições
+model_locks = {}
+
+# Gerações em andamento por chave de cache (request coalescing)
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+# Tokenizers ficam carregados mesmo após descarregar o modelo (são leves)
+tokenizers = {}
+
+# Entradas tokenizadas mantidas em cache (frases repetidas são comuns)
+TOKENIZE_CACHE_SIZE = int(os.getenv("TOKENIZE_CACHE_SIZE", "1024"))
+
+# Micro-batching da inferência: textos do mesmo modelo que chegam dentro da janela
+# TTS_BATCH_WAIT_MS viram um único forward (TTS_BATCH_MAX=1 desativa)
+TTS_BATCH_MAX = max(1, int(os.getenv("TTS_BATCH_MAX", "1")))
+TTS_BATCH_WAIT = float(os.getenv("TTS_BATCH_WAIT_MS", "8")) / 1000.0
+_batch_queues = {}
+_batch_queues_lock = threading.Lock()
 
 # Configuração dos modelos disponíveis
 MODEL_CONFIG = {
@@ -154,6 +326,24 @@ MODEL_CONFIG = {
     },
 }
 
+# Índice idioma -> (model_key, config), montado uma vez a partir do MODEL_CONFIG
+LANG_TO_MODEL = {
+    lang: (model_key, config)
+    for model_key, config in MODEL_CONFIG.items()
+    for lang in config["supported_languages"]
+}
+
+# Lista de idiomas retornada por /languages
+ALL_LANGUAGES = {
+    lang_code: {
+        "name": lang_name,
+        "model": config["name"],
+        "model_key": model_key
+    }
+    for model_key, config in MODEL_CONFIG.items()
+    for lang_code, lang_name in config["supported_languages"].items()
+}
+
 # Presets de voz (simplificados para MMS-TTS)
 VOICE_PRESETS = {
     "natural": {
@@ -178,6 +368,45 @@ VOICE_PRESETS = {
     }
 }
 
+# Corpos JSON estáticos de /models, /languages e /voice-presets, serializados uma vez;
+# por requisição só o campo "user" é acrescentado
+def _static_body_prefix(payload: dict) -> bytes:
+    return json_dumps(payload)[:-1] + b',"user":'
+
+MODELS_BODY_PREFIX = _static_body_prefix({"models": MODEL_CONFIG, "total_models": len(MODEL_CONFIG)})
+LANGUAGES_BODY_PREFIX = _static_body_prefix({"supported_languages": ALL_LANGUAGES, "total_languages": len(ALL_LANGUAGES)})
+PRESETS_BODY_PREFIX = _static_body_prefix({"presets": VOICE_PRESETS, "note": "MMS-TTS models have limited parameter support."})
+
+@lru_cache(maxsize=1024)
+def _static_etag(prefix: bytes, user_json: bytes) -> str:
+    return '"' + hashlib.md5(prefix + user_json).hexdigest() + '"'
+
+def static_json_response(prefix: bytes, user, request: Request) -> Response:
+    """Corpo estático + "user", com ETag; If-None-Match igual responde 304 sem corpo"""
+    user_json = json_dumps(user)
+    etag = _static_etag(prefix, user_json)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=prefix + user_json + b"}", media_type="application/json", headers=headers)
+
+# Configurações são constantes: somente leitura (os corpos acima já foram serializados)
+MODEL_CONFIG = MappingProxyType(MODEL_CONFIG)
+VOICE_PRESETS = MappingProxyType(VOICE_PRESETS)
+ALL_LANGUAGES = MappingProxyType(ALL_LANGUAGES)
+
+# Locks de carregamento por modelo (evita carregar o mesmo modelo duas vezes).
+# Um lock fixo por chave durante toda a vida do processo: trocar o lock permitiria
+# duas cargas simultâneas do mesmo modelo
+_load_locks = {key: threading.Lock() for key in MODEL_CONFIG}
+
+# Visões derivadas do MODEL_CONFIG para as rotas (montadas uma vez)
+AVAILABLE_MODELS = tuple(MODEL_CONFIG)
+MODEL_INFO_FLAT = MappingProxyType({
+    key: {"name": config["name"], "languages": tuple(config["supported_languages"])}
+    for key, config in MODEL_CONFIG.items()
+})
+
 # Mapeamento de códigos de idioma MMS -> Whisper ISO
 WHISPER_LANG_MAP = {
     "heb": "he",  # Hebrew
@@ -185,32 +414,82 @@ WHISPER_LANG_MAP = {
     "por": "pt"   # Portuguese
 }
 
+def _loaded_model(model_key: str):
+    """Retorna (model, tokenizer) se o modelo já está carregado, senão None"""
+    wrapper = models.get(model_key)
+    if wrapper is None:
+        return None
+    try:
+        models.move_to_end(model_key)
+    except KeyError:
+        # Descarregado por outra requisição entre o get e o move
+        pass
+    wrapper.mark_used()
+    logger.debug("Model cache HIT: %s (used %d times)", model_key, wrapper.usage_count)
+    return wrapper.model, wrapper.tokenizer
+
 def load_model(model_key: str):
     """Carrega modelo dinamicamente com accelerate (compatível CPU/GPU)"""
     # Se modelo já está carregado, atualizar uso e retornar
-    if model_key in models:
-        models[model_key].mark_used()
-        logger.info(f"Model cache HIT: {model_key} (used {models[model_key].usage_count} times)")
-        return models[model_key].model, models[model_key].tokenizer
+    loaded = _loaded_model(model_key)
+    if loaded:
+        return loaded
+    
+    # Um carregamento por modelo: requisições simultâneas esperam o primeiro
+    with _load_locks[model_key]:
+        loaded = _loaded_model(model_key)
+        if loaded:
+            return loaded
+        return _load_model_locked(model_key)
+
+def _evict_least_used_model():
+    """Descarrega o modelo menos usado recentemente (início do OrderedDict).
+
+    Retorna False se não havia modelo: a checagem dos chamadores não é atômica
+    entre modelos diferentes, então outra carga pode ter esvaziado o dict.
+    """
+    try:
+        least_used_key, least_used = models.popitem(last=False)
+    except KeyError:
+        return False
+    
+    logger.info(f"Unloading model '{least_used_key}' (used {least_used.usage_count} times, last: {time.time() - least_used.last_used:.0f}s ago)")
+    
+    # Memória é reaproveitada pelo alocador; defrag explícito só se habilitado
+    if EMPTY_CACHE_ON_EVICT:
+        threading.Thread(target=release_memory, name="release-memory", daemon=True).start()
     
+    logger.info(f"Model '{least_used_key}' unloaded")
+    return True
+
+def memory_free_ratio():
+    """Fração de memória livre (VRAM na GPU, RAM na CPU); None se não der para medir"""
+    if has_cuda:
+        free, total = torch.cuda.mem_get_info()
+        # Blocos reservados pelo alocador mas sem uso também estão livres para o próximo modelo
+        free += torch.cuda.memory_reserved() - torch.cuda.memory_allocated()
+        return free / total
+    try:
+        import psutil
+    except ImportError:
+        return None
+    vm = psutil.virtual_memory()
+    return vm.available / vm.total
+
+def _load_model_locked(model_key: str):
     # Verificar se precisa descarregar modelo menos usado
-    if len(models) >= MAX_LOADED_MODELS:
-        # Encontrar modelo menos usado recentemente
-        least_used_key = min(models.keys(), key=lambda k: models[k].last_used)
-        least_used = models[least_used_key]
-        
-        logger.info(f"Unloading model '{least_used_key}' (used {least_used.usage_count} times, last: {time.time() - least_used.last_used:.0f}s ago)")
-        
-        # Remover referências
-        del models[least_used_key]
-        
-        # Liberar memória
-        if has_cuda:
-            torch.cuda.empty_cache()
-        import gc
-        gc.collect()
-        
-        logger.info(f"Model '{least_used_key}' unloaded, memory freed")
+    if models and len(models) >= MAX_LOADED_MODELS:
+        _evict_least_used_model()
+    
+    # Pressão de memória: descarregar enquanto a memória livre estiver abaixo do limite
+    if MEMORY_FREE_THRESHOLD > 0:
+        while models:
+            ratio = memory_free_ratio()
+            if ratio is None or ratio >= MEMORY_FREE_THRESHOLD:
+                break
+            logger.warning(f"Memory pressure: {ratio:.0%} free < {MEMORY_FREE_THRESHOLD:.0%}")
+            if not _evict_least_used_model():
+                break
     
     config = MODEL_CONFIG[model_key]
     # Carregar modelo sempre como float32 para evitar erros de precisão mista
@@ -223,10 +502,25 @@ def load_model(model_key: str):
         torch_dtype=safe_dtype,
     )
     
-    tokenizer = AutoTokenizer.from_pretrained(config["model_id"])
+    tokenizer = tokenizers.get(model_key)
+    if tokenizer is None:
+        # VitsTokenizer não tem versão "fast"; use_fast vale se o modelo trouxer uma
+        tokenizer = AutoTokenizer.from_pretrained(config["model_id"], use_fast=True)
+        tokenizers[model_key] = tokenizer
+    
+    # accelerator.prepare só quando há mixed precision (ele instala o autocast no forward);
+    # caso contrário basta mover o modelo para o device, sem hooks extras
+    if accelerator.mixed_precision != "no":
+        model = accelerator.prepare(model)
+    else:
+        model = model.to(device)
+    model.eval()
     
-    # Preparar modelo com accelerator
-    model = accelerator.prepare(model)
+    if TTS_QUANT_INT8:
+        model = quantize_model(model)
+    
+    if TORCH_COMPILE:
+        model = compile_model(model)
     
     # Criar wrapper e armazenar
     wrapper = ModelWrapper(model, tokenizer)
@@ -235,12 +529,253 @@ def load_model(model_key: str):
     logger.info(f"Model {config['name']} loaded successfully with accelerate")
     return model, tokenizer
 
+@lru_cache(maxsize=TOKENIZE_CACHE_SIZE)
+def tokenize(model_key: str, text: str):
+    """Tokeniza o texto com o tokenizer do modelo (resultado em cache LRU)"""
+    return tokenizers[model_key](text, return_tensors="pt")
+
+def _resolve_speed(tts_model, final_speed: float):
+    """Retorna (modelo base, final_speed); 1.0 se o modelo não tiver speaking_rate"""
+    base_model = getattr(tts_model, "_orig_mod", tts_model)
+    if final_speed != 1.0 and not hasattr(base_model, "speaking_rate"):
+        logger.warning("Model has no speaking_rate, speed adjustment skipped")
+        final_speed = 1.0
+    return base_model, final_speed
+
+def _inputs_to_device(inputs):
+    if has_cuda:
+        # Cópia host->GPU assíncrona a partir de memória pinned
+        return {k: v.pin_memory().to(accelerator.device, non_blocking=True) for k, v in inputs.items()}
+    return {k: v.to(accelerator.device) for k, v in inputs.items()}
+
+def _run_forward(tts_model, base_model, model_key: str, inputs, final_speed: float, postprocess):
+    """Forward do VITS sob o limite de concorrência e o lock do modelo.
+
+    postprocess(output) roda ainda dentro do lock e deve devolver dados já na CPU:
+    com torch.compile "reduce-overhead" na GPU (CUDA graphs) os buffers de saída
+    são reaproveitados no próximo forward do mesmo modelo.
+    """
+    # Lock do modelo antes do semáforo: quem espera por um modelo ocupado não
+    # segura uma vaga que outro modelo poderia usar
+    with model_locks.setdefault(model_key, threading.Lock()), infer_semaphore:
+        # Velocidade aplicada no próprio VITS (length_scale = 1 / speaking_rate),
+        # sem time-stretch do áudio gerado
+        if hasattr(base_model, "speaking_rate"):
+            base_model.speaking_rate = 1.0 / final_speed
+        
+        with torch.inference_mode(), inference_autocast():
+            # FIX: VITS model has issues with autocast combined with index_put
+            # Better to let accelerator handle types or use model's native precision
+            # (BF16 na CPU é opt-in via TTS_CPU_BF16)
+            return postprocess(tts_model(**inputs))
+
+def _waveform(output):
+    """Extrai o tensor de áudio da saída do modelo"""
+    if hasattr(output, 'waveform'):
+        return output.waveform
+    if hasattr(output, 'audio'):
+        return output.audio
+    return output
+
+def _to_int16(wave):
+    """Converte o áudio para int16 no device do modelo.
+
+    Saída FP16/BF16 passa para FP32 antes da escala para não perder precisão.
+    clamp fora do lugar: a saída do modelo (buffer do CUDA graph) não é alterada.
+    """
+    if wave.dtype != torch.float32:
+        wave = wave.float()
+    wave = wave.clamp(-1.0, 1.0).mul_(32767.0).round_()
+    return wave.to(torch.int16)
+
+def _batch_pcm(output):
+    """Uma cópia para a CPU do lote inteiro + comprimento de cada item"""
+    pcm_batch = _to_int16(_waveform(output)).cpu()
+    lengths = getattr(output, "sequence_lengths", None)
+    lengths = lengths.tolist() if lengths is not None else [pcm_batch.shape[-1]] * pcm_batch.shape[0]
+    return pcm_batch, lengths
+
+def _single_pcm(output):
+    """PCM int16 calculado no device do modelo; só os bytes int16 são copiados para a CPU"""
+    return _to_int16(_waveform(output).squeeze()).cpu()
+
+def _infer_batch(model_key: str, items):
+    """Roda um forward para vários textos do mesmo modelo e velocidade.
+
+    items: lista de (text, final_speed, Future); cada Future recebe os bytes PCM.
+    """
+    try:
+        tts_model, _ = load_model(model_key)
+        base_model, final_speed = _resolve_speed(tts_model, items[0][1])
+        texts = [text for text, _, _ in items]
+        inputs = _inputs_to_device(tokenizers[model_key](texts, padding=True, return_tensors="pt"))
+        pcm_batch, lengths = _run_forward(tts_model, base_model, model_key, inputs, final_speed, _batch_pcm)
+        for i, (_, _, future) in enumerate(items):
+            future.set_result(pcm_batch[i, :lengths[i]].numpy().tobytes())
+    except BaseException as e:
+        for _, _, future in items:
+            if not future.done():
+                future.set_exception(e)
+
+def _batch_worker(model_key: str, batch_queue: queue.Queue):
+    """Agrupa pedidos de um modelo por até TTS_BATCH_WAIT e executa em lote"""
+    while True:
+        batch = [batch_queue.get()]
+        deadline = time.monotonic() + TTS_BATCH_WAIT
+        while len(batch) < TTS_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(batch_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        # speaking_rate é do modelo: um forward por velocidade
+        by_speed = defaultdict(list)
+        for item in batch:
+            by_speed[item[1]].append(item)
+        for items in by_speed.values():
+            _infer_batch(model_key, items)
+        logger.debug("Batch %s: %d texts", model_key, len(batch))
+
+def infer_batched(model_key: str, text: str, final_speed: float) -> bytes:
+    """Envia o texto para o micro-batcher do modelo e espera o PCM int16"""
+    with _batch_queues_lock:
+        batch_queue = _batch_queues.get(model_key)
+        if batch_queue is None:
+            batch_queue = _batch_queues[model_key] = queue.Queue()
+            threading.Thread(
+                target=_batch_worker, args=(model_key, batch_queue),
+                name=f"tts-batch-{model_key}", daemon=True
+            ).start()
+    future = Future()
+    batch_queue.put((text, final_speed, future))
+    return future.result()
+
+def synthesize_to_mp3(text: str, lang: str, model_key: str, final_speed: float):
+    """Gera o áudio do texto e salva como MP3 no diretório de cache.
+
+    Retorna (mp3_path, file_size, final_speed, file_id); final_speed volta 1.0
+    se o ajuste de velocidade não puder ser aplicado.
+    """
+    tts_model, _ = load_model(model_key)
+    base_model, final_speed = _resolve_speed(tts_model, final_speed)
+    
+    if TTS_BATCH_MAX > 1:
+        pcm = infer_batched(model_key, text, final_speed)
+    else:
+        # Gerar áudio usando MMS-TTS com accelerate
+        inputs = _inputs_to_device(tokenize(model_key, text))
+        pcm = _run_forward(tts_model, base_model, model_key, inputs, final_speed, _single_pcm).numpy().tobytes()
+    
+    # Obter sample rate do modelo
+    sample_rate = getattr(tts_model.config, 'sampling_rate', 22050)
+    
+    # ID do arquivo = chave do cache TTS (BLAKE2b com separadores entre os campos)
+    file_id = db_manager.compute_cache_key(text, lang, model_key, final_speed)
+    
+    mp3_path = os.path.join(CACHE_DIR, f"tts_{file_id}.mp3")
+    
+    # Converter para MP3 direto do PCM em memória (sem WAV intermediário)
+    file_size = encode_mp3(pcm, sample_rate, mp3_path)
+    
+    return mp3_path, file_size, final_speed, file_id
+
+def encode_mp3(pcm: bytes, sample_rate: int, mp3_path: str) -> int:
+    """Codifica PCM int16 mono em MP3 (128k) e grava em mp3_path.
+
+    Usa o lameenc (sem subprocesso) ou o ffmpeg (PCM pelo stdin, MP3 pelo stdout);
+    sem nenhum dos dois, cai no pydub.
+    Retorna o tamanho do MP3 em bytes, sem precisar de stat no arquivo.
+    """
+    if lameenc is not None:
+        encoder = lameenc.Encoder()
+        encoder.set_bit_rate(128)
+        encoder.set_in_sample_rate(sample_rate)
+        encoder.set_channels(1)
+        mp3_bytes = encoder.encode(pcm) + encoder.flush()
+    elif FFMPEG_BIN:
+        mp3_bytes = subprocess.run(
+            [FFMPEG_BIN, "-loglevel", "error",
+             "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+             "-b:a", "128k", "-f", "mp3", "pipe:1"],
+            input=pcm, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True
+        ).stdout
+    else:
+        audio_segment = AudioSegment(data=pcm, sample_width=2, frame_rate=sample_rate, channels=1)
+        mp3_bytes = audio_segment.export(io.BytesIO(), format="mp3", bitrate="128k").getvalue()
+    with open(mp3_path, "wb") as f:
+        f.write(mp3_bytes)
+    return len(mp3_bytes)
+
+def generate_and_cache(text: str, lang: str, model_key: str, final_speed: float):
+    """Gera o MP3 e registra no cache do banco.
+
+    Retorna (mp3_path, final_speed, file_id, cache_entry_id). Requisições idênticas
+    simultâneas esperam a geração em andamento em vez de repetir a inferência.
+    Bloqueante: nas rotas async deve rodar no threadpool.
+    """
+    key = db_manager.compute_cache_key(text, lang, model_key, final_speed)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = _inflight[key] = Future()
+    
+    if not owner:
+        return future.result()
+    
+    try:
+        mp3_path, file_size, final_speed, file_id = synthesize_to_mp3(text, lang, model_key, final_speed)
+        cache_entry_id = db_manager.save_cache_entry(
+            text, lang, model_key, final_speed, mp3_path, file_size, text_hash=file_id
+        )
+        result = (mp3_path, final_speed, file_id, cache_entry_id)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+def cached_or_generate(cache_entry, text: str, lang: str, model_key: str, final_speed: float):
+    """Resolve o /speak fora do event loop: cache (banco + arquivo) ou nova geração.
+
+    cache_entry é o resultado de peek_cache_entry (None se não estava em memória).
+    Retorna (mp3_path, final_speed, file_id, stat_result, hit_count); hit_count é
+    None quando o áudio foi gerado agora.
+    """
+    if cache_entry is None:
+        cache_entry = db_manager.get_cache_entry(text, lang, model_key, final_speed)
+    if cache_entry:
+        try:
+            # Um único stat, reaproveitado pelo FileResponse
+            stat_result = os.stat(cache_entry['file_path'])
+            return cache_entry['file_path'], final_speed, None, stat_result, cache_entry['hit_count']
+        except FileNotFoundError:
+            # Arquivo removido fora do cache: reparar a entrada e gerar de novo
+            db_manager.invalidate_cache_entry(cache_entry['id'])
+    
+    logger.debug("Cache MISS - Generating new audio: '%.50s...'", text)
+    mp3_path, final_speed, file_id, _ = generate_and_cache(text, lang, model_key, final_speed)
+    return mp3_path, final_speed, file_id, None, None
+
+def audio_file_response(path: str, filename: str, headers: dict = None, stat_result=None):
+    """Resposta com o MP3: FileResponse ou, com X_ACCEL_ENABLED, só o redirect interno do nginx"""
+    if X_ACCEL_ENABLED:
+        accel_headers = dict(headers or {})
+        accel_headers["X-Accel-Redirect"] = X_ACCEL_PREFIX + os.path.basename(path)
+        accel_headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return Response(headers=accel_headers, media_type="audio/mpeg")
+    return FileResponse(path, media_type="audio/mpeg", filename=filename,
+                        headers=headers, stat_result=stat_result)
+
 def get_model_for_language(lang: str):
     """Determina qual modelo usar para um idioma específico"""
-    for model_key, config in MODEL_CONFIG.items():
-        if lang in config["supported_languages"]:
-            return model_key, config
-    return None, None
+    return LANG_TO_MODEL.get(lang, (None, None))
 
 # ============================================
 # INICIALIZAÇÃO DO WHISPER (STARTUP)
@@ -268,6 +803,11 @@ def initialize_whisper():
 # Função para inicialização automática na primeira execução
 def initialize_app():
     """Inicializa aplicação na primeira execução"""
+    # Schema/migrações do banco (uma vez por processo)
+    db_manager.init()
+    
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    
     # Verificar se deve inicializar dados padrão automaticamente
     auto_init = os.getenv("AUTO_INIT_DEFAULT_DATA", "false").lower() == "true"
     
@@ -293,8 +833,32 @@ def initialize_app():
     # Inicializar Whisper model para word alignment
     initialize_whisper()
 
-# Chamar inicialização na startup
-initialize_app()
+# Chamar inicialização na startup (uma vez por processo, não a cada import)
+app.add_event_handler("startup", initialize_app)
+
+# Modelos carregados no startup: "all", "none" ou lista (ex: "hebrew,greek")
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "all").strip().lower()
+
+@app.on_event("startup")
+def preload_models():
+    """Carrega os modelos antes das primeiras requisições (sem cold start no /speak)"""
+    if PRELOAD_MODELS in ("", "none"):
+        return
+    if PRELOAD_MODELS == "all":
+        keys = list(MODEL_CONFIG)
+    else:
+        keys = [k.strip() for k in PRELOAD_MODELS.split(",") if k.strip() in MODEL_CONFIG]
+    
+    # Não carregar mais do que cabe na memória (evitaria descarregar os primeiros)
+    if len(keys) > MAX_LOADED_MODELS:
+        logger.warning(f"PRELOAD_MODELS limited to {MAX_LOADED_MODELS} models: skipping {keys[MAX_LOADED_MODELS:]}")
+        keys = keys[:MAX_LOADED_MODELS]
+    
+    for model_key in keys:
+        try:
+            load_model(model_key)
+        except Exception as e:
+            logger.error(f"Error preloading model '{model_key}': {e}")
 
 # ============================================
 # ROTAS DE AUTENTICAÇÃO
@@ -307,7 +871,7 @@ def login(
     password: str = Form(...)
 ):
     """Login com usuário/senha (retorna JWT)"""
-    ip_address = request.headers.get("X-Forwarded-For", request.client.host if request.client else "unknown")
+    ip_address = get_client_ip(request)
     
     user_data = db_manager.authenticate_user(username, password, ip_address)
     if not user_data:
@@ -375,7 +939,7 @@ def root():
                 "profile": "/auth/me"
             }
         },
-        "models": list(MODEL_CONFIG.keys()),
+        "models": AVAILABLE_MODELS,
         "supported_languages": ["heb (Hebrew)", "ell (Greek)", "por (Portuguese)"],
         "public_endpoints": ["/", "/docs", "/auth/login"],
         "protected_endpoints": [
@@ -389,7 +953,7 @@ def root():
     }
 
 @app.post("/speak")
-def speak(
+async def speak(
     background_tasks: BackgroundTasks,
     text: str = Form(...), 
     lang: str = Form(...), 
@@ -410,7 +974,7 @@ def speak(
         raise HTTPException(status_code=400, detail="Text too long (max 5000 characters)")
     
     try:
-        logger.info(f"TTS request from user: {current_user.get('name', 'Unknown')} - Text: '{text[:50]}...'")
+        logger.debug("TTS request from user: %s - Text: '%.50s...'", current_user.get('name', 'Unknown'), text)
         
         # Determinar configurações finais
         if preset:
@@ -446,13 +1010,20 @@ def speak(
             )
         
         # ====== VERIFICAR CACHE ======
-        cache_entry = db_manager.get_cache_entry(text, lang, model_key, final_speed)
-        if cache_entry:
-            logger.info(f"Returning cached audio for user {current_user.get('name')}: '{text[:50]}...' (hit #{cache_entry['hit_count']})")
-            return FileResponse(
-                cache_entry['file_path'], 
-                media_type="audio/mpeg", 
-                filename=f"tts_{lang}_{os.path.basename(cache_entry['file_path'])}",
+        # No event loop só a consulta ao cache em memória (sem SQLite nem disco);
+        # SELECT de fallback, stat, reparo e geração rodam no threadpool
+        cache_entry = db_manager.peek_cache_entry(
+            db_manager.compute_cache_key(text, lang, model_key, final_speed)
+        )
+        mp3_path, final_speed, cache_id, stat_result, hit_count = await run_in_threadpool(
+            cached_or_generate, cache_entry, text, lang, model_key, final_speed
+        )
+        if hit_count is not None:
+            logger.debug("Returning cached audio for user %s: '%.50s...' (hit #%s)", current_user.get('name'), text, hit_count)
+            return audio_file_response(
+                mp3_path,
+                filename=f"tts_{lang}_{os.path.basename(mp3_path)}",
+                stat_result=stat_result,
                 headers={
                     "X-Model-Used": model_config["name"],
                     "X-Language": model_config["supported_languages"][lang],
@@ -461,80 +1032,16 @@ def speak(
                     "X-User": current_user.get("name", "Unknown"),
                     "X-Auth-Type": current_user.get("type", "unknown"),
                     "X-Cache-Hit": "true",
-                    "X-Cache-Hits": str(cache_entry['hit_count'])
+                    "X-Cache-Hits": str(hit_count)
                 }
             )
         
-        # ====== GERAR ÁUDIO (CACHE MISS) ======
-        logger.info(f"Cache MISS - Generating new audio: '{text[:50]}...'")
-        
-        # Carregar modelo
-        tts_model, tts_tokenizer = load_model(model_key)
-        
-        # Gerar áudio usando MMS-TTS com accelerate
-        inputs = tts_tokenizer(text, return_tensors="pt")
-        inputs = {k: v.to(accelerator.device) for k, v in inputs.items()}
-        
-        with torch.no_grad():
-            # FIX: VITS model has issues with autocast combined with index_put
-            # Better to let accelerator handle types or use model's native precision
-            output = tts_model(**inputs)
-            
-            # Extrair tensor de áudio
-            if hasattr(output, 'waveform'):
-                audio_tensor = output.waveform
-            elif hasattr(output, 'audio'):
-                audio_tensor = output.audio
-            else:
-                audio_tensor = output
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Generated audio for user %s: '%s' (%s) - speed:%s - %s",
+                         current_user.get('name'), text, lang, final_speed, config_source)
         
-        # Converter para numpy
-        audio = audio_tensor.cpu().float().numpy().squeeze()
-        
-        # Aplicar ajuste de velocidade se necessário
-        if final_speed != 1.0:
-            try:
-                import librosa
-                audio = librosa.effects.time_stretch(audio, rate=1.0/final_speed)
-                logger.info(f"Applied speed adjustment: {final_speed}")
-            except ImportError:
-                logger.warning("librosa not available, speed adjustment skipped")
-                final_speed = 1.0
-        
-        # Obter sample rate do modelo
-        sample_rate = getattr(tts_model.config, 'sampling_rate', 22050)
-        
-        # Criar diretórios de cache
-        cache_dir = os.path.join(os.getcwd(), "cache")
-        temp_dir = os.path.join(os.getcwd(), "temp")
-        os.makedirs(cache_dir, exist_ok=True)
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        # Gerar ID único para o cache
-        cache_id = hashlib.sha256(f"{text}{lang}{model_key}{final_speed}".encode()).hexdigest()[:16]
-        
-        wav_path = os.path.join(temp_dir, f"tts_{cache_id}.wav")
-        mp3_path = os.path.join(cache_dir, f"tts_{cache_id}.mp3")
-        
-        # Salvar como WAV
-        write(wav_path, sample_rate, (audio * 32767).astype(np.int16))
-        
-        # Converter para MP3
-        audio_segment = AudioSegment.from_wav(wav_path)
-        audio_segment.export(mp3_path, format="mp3", bitrate="128k")
-        
-        # Limpar arquivo WAV temporário
-        os.remove(wav_path)
-        
-        # Salvar no cache do banco de dados
-        file_size = os.path.getsize(mp3_path)
-        db_manager.save_cache_entry(text, lang, model_key, final_speed, mp3_path, file_size)
-        
-        logger.info(f"Generated audio for user {current_user.get('name')}: '{text}' ({lang}) - speed:{final_speed} - {config_source}")
-        
-        return FileResponse(
-            mp3_path, 
-            media_type="audio/mpeg", 
+        return audio_file_response(
+            mp3_path,
             filename=f"tts_{lang}_{cache_id}.mp3",
             headers={
                 "X-Model-Used": model_config["name"],
@@ -579,7 +1086,7 @@ def speak_sync(
         raise HTTPException(status_code=400, detail="Text too long (max 5000 characters)")
     
     try:
-        logger.info(f"TTS sync request from user: {current_user.get('name', 'Unknown')} - Text: '{text[:50]}...'")
+        logger.debug("TTS sync request from user: %s - Text: '%.50s...'", current_user.get('name', 'Unknown'), text)
         
         # ====== PARTE 1: GERAR ÁUDIO (igual ao /speak) ======
         
@@ -615,77 +1122,23 @@ def speak_sync(
         
         # Verificar cache de áudio
         cache_entry = db_manager.get_cache_entry(text, lang, model_key, final_speed)
+        if cache_entry and not os.path.isfile(cache_entry['file_path']):
+            # Arquivo removido fora do cache: reparar a entrada e gerar de novo
+            db_manager.invalidate_cache_entry(cache_entry['id'])
+            cache_entry = None
         
         if cache_entry:
             # Cache HIT - áudio já existe
             audio_path = cache_entry['file_path']
             cache_id = cache_entry['id']
-            logger.info(f"Audio cache HIT for sync request: '{text[:50]}...' (hit #{cache_entry['hit_count']})")
+            logger.debug("Audio cache HIT for sync request: '%.50s...' (hit #%s)", text, cache_entry['hit_count'])
         else:
             # Cache MISS - gerar novo áudio
-            logger.info(f"Audio cache MISS - Generating new audio for sync: '{text[:50]}...'")
-            
-            # Carregar modelo TTS
-            tts_model, tts_tokenizer = load_model(model_key)
-            
-            # Gerar áudio
-            inputs = tts_tokenizer(text, return_tensors="pt")
-            inputs = {k: v.to(accelerator.device) for k, v in inputs.items()}
-            
-            with torch.no_grad():
-                # FIX: VITS model has issues with autocast combined with index_put
-                # Better to let accelerator handle types or use model's native precision
-                output = tts_model(**inputs)
-                
-                if hasattr(output, 'waveform'):
-                    audio_tensor = output.waveform
-                elif hasattr(output, 'audio'):
-                    audio_tensor = output.audio
-                else:
-                    audio_tensor = output
-            
-            # Converter para numpy
-            audio = audio_tensor.cpu().float().numpy().squeeze()
+            logger.debug("Audio cache MISS - Generating new audio for sync: '%.50s...'", text)
             
-            # Aplicar ajuste de velocidade
-            if final_speed != 1.0:
-                try:
-                    import librosa
-                    audio = librosa.effects.time_stretch(audio, rate=1.0/final_speed)
-                except ImportError:
-                    logger.warning("librosa not available, speed adjustment skipped")
-                    final_speed = 1.0
+            audio_path, final_speed, _, cache_id = generate_and_cache(text, lang, model_key, final_speed)
             
-            # Sample rate
-            sample_rate = getattr(tts_model.config, 'sampling_rate', 22050)
-            
-            # Criar diretórios
-            cache_dir = os.path.join(os.getcwd(), "cache")
-            temp_dir = os.path.join(os.getcwd(), "temp")
-            os.makedirs(cache_dir, exist_ok=True)
-            os.makedirs(temp_dir, exist_ok=True)
-            
-            # Gerar ID único
-            cache_id_hash = hashlib.sha256(f"{text}{lang}{model_key}{final_speed}".encode()).hexdigest()[:16]
-            
-            wav_path = os.path.join(temp_dir, f"tts_{cache_id_hash}.wav")
-            audio_path = os.path.join(cache_dir, f"tts_{cache_id_hash}.mp3")
-            
-            # Salvar WAV
-            write(wav_path, sample_rate, (audio * 32767).astype(np.int16))
-            
-            # Converter para MP3
-            audio_segment = AudioSegment.from_wav(wav_path)
-            audio_segment.export(audio_path, format="mp3", bitrate="128k")
-            
-            # Limpar WAV temporário
-            os.remove(wav_path)
-            
-            # Salvar no cache do banco
-            file_size = os.path.getsize(audio_path)
-            cache_id = db_manager.save_cache_entry(text, lang, model_key, final_speed, audio_path, file_size)
-            
-            logger.info(f"Audio generated and cached (ID: {cache_id}) for sync request")
+            logger.debug("Audio generated and cached (ID: %s) for sync request", cache_id)
         
         # ====== PARTE 2: ALINHAMENTO DE PALAVRAS ======
         
@@ -695,10 +1148,10 @@ def speak_sync(
         if alignment_cache:
             # Cache HIT - alinhamento já existe
             words = alignment_cache['words']
-            logger.info(f"Alignment cache HIT: {len(words)} words (cache_id: {cache_id})")
+            logger.debug("Alignment cache HIT: %d words (cache_id: %s)", len(words), cache_id)
         else:
             # Cache MISS - realizar alinhamento
-            logger.info(f"Alignment cache MISS - Running word alignment for cache_id: {cache_id}")
+            logger.debug("Alignment cache MISS - Running word alignment for cache_id: %s", cache_id)
             
             try:
                 from .word_alignment import align_words
@@ -709,7 +1162,7 @@ def speak_sync(
                 if words:
                     # Salvar no cache de alinhamento
                     db_manager.save_alignment_cache(cache_id, words)
-                    logger.info(f"Word alignment successful: {len(words)} words aligned")
+                    logger.debug("Word alignment successful: %d words aligned", len(words))
                 else:
                     logger.warning(f"Word alignment returned empty result for cache_id: {cache_id}")
                     
@@ -738,7 +1191,7 @@ def speak_sync(
             "alignment_cache_hit": alignment_cache is not None
         }
         
-        logger.info(f"Sync response ready: {len(words)} words, cache_hit={cache_entry is not None}")
+        logger.debug("Sync response ready: %d words, cache_hit=%s", len(words), cache_entry is not None)
         
         return response_data
         
@@ -774,17 +1227,12 @@ def serve_audio(
     if not filename.endswith('.mp3') or '..' in filename or '/' in filename:
         raise HTTPException(status_code=400, detail="Invalid filename")
     
-    cache_dir = os.path.join(os.getcwd(), "cache")
-    audio_path = os.path.join(cache_dir, filename)
+    audio_path = os.path.join(CACHE_DIR, filename)
     
     if not os.path.exists(audio_path):
         raise HTTPException(status_code=404, detail="Audio file not found")
     
-    return FileResponse(
-        audio_path,
-        media_type="audio/mpeg",
-        filename=filename
-    )
+    return audio_file_response(audio_path, filename=filename)
 
 @app.get("/health/detailed")
 def health_check_detailed(current_user: dict = Depends(get_current_active_user)):
@@ -803,62 +1251,83 @@ def health_check_detailed(current_user: dict = Depends(get_current_active_user))
     }
 
 @app.get("/models")
-def get_models(current_user: dict = Depends(get_current_active_user)):
+def get_models(request: Request, current_user: dict = Depends(get_current_active_user)):
     """Lista modelos (protegido)"""
-    return {
-        "models": MODEL_CONFIG,
-        "total_models": len(MODEL_CONFIG),
-        "user": current_user.get("name")
-    }
+    return static_json_response(MODELS_BODY_PREFIX, current_user.get("name"), request)
 
 @app.get("/languages") 
-def get_supported_languages(current_user: dict = Depends(get_current_active_user)):
+def get_supported_languages(request: Request, current_user: dict = Depends(get_current_active_user)):
     """Lista idiomas (protegido)"""
-    all_languages = {}
-    for model_key, config in MODEL_CONFIG.items():
-        for lang_code, lang_name in config["supported_languages"].items():
-            all_languages[lang_code] = {
-                "name": lang_name,
-                "model": config["name"],
-                "model_key": model_key
-            }
-    
-    return {
-        "supported_languages": all_languages,
-        "total_languages": len(all_languages),
-        "user": current_user.get("name")
-    }
+    return static_json_response(LANGUAGES_BODY_PREFIX, current_user.get("name"), request)
 
 @app.get("/voice-presets")
-def get_voice_presets(current_user: dict = Depends(get_current_active_user)):
+def get_voice_presets(request: Request, current_user: dict = Depends(get_current_active_user)):
     """Lista presets (protegido)"""
-    return {
-        "presets": VOICE_PRESETS,
-        "user": current_user.get("name"),
-        "note": "MMS-TTS models have limited parameter support."
-    }
+    return static_json_response(PRESETS_BODY_PREFIX, current_user.get("name"), request)
 
 # ============================================
 # ROTAS ADMINISTRATIVAS
 # ============================================
 
+@lru_cache(maxsize=256)
+def parse_permissions_csv(permissions: str) -> tuple:
+    """CSV de permissões -> tupla sem espaços/vazios (poucos valores distintos: fica em cache)"""
+    return tuple(p for p in (x.strip() for x in permissions.split(",")) if p)
+
+def _admin_label(admin_user: dict):
+    """Nome do admin para as respostas (username do JWT ou nome da API key)"""
+    return admin_user.get("username", admin_user.get("name"))
+
+def _create_api_key_response(name: str, permissions: str, rate_limit: int,
+                             expires_days: int, admin_user: dict) -> dict:
+    """Cria a API key e monta a resposta (usado por /admin/generate-api-key e /admin/create-api-key)"""
+    permissions_list = list(parse_permissions_csv(permissions))
+    created_by = admin_user.get("user_id") if admin_user["type"] == "jwt" else None
+    
+    api_key = db_manager.create_api_key(
+        name=name,
+        permissions=permissions_list,
+        rate_limit=rate_limit,
+        expires_days=expires_days,
+        created_by=created_by
+    )
+    
+    return {
+        "message": f"API key '{name}' created successfully",
+        "api_key": api_key,
+        "name": name,
+        "permissions": permissions_list,
+        "rate_limit": rate_limit,
+        "expires_days": expires_days,
+        "created_by": _admin_label(admin_user),
+        "usage": {
+            "header": "X-API-Key",
+            "example": f"curl -H 'X-API-Key: {api_key}' https://your-api.com/speak"
+        }
+    }
+
 @app.get("/admin/users")
 def list_active_users(admin_user: dict = Depends(get_admin_user)):
     """Lista usuários ativos (apenas admin)"""
     with db_manager.get_connection() as conn:
+        # Contagem via idx_sessions_live
         active_sessions = conn.execute(
-            "SELECT COUNT(*) as count FROM sessions WHERE is_revoked = 0 AND expires_at > CURRENT_TIMESTAMP"
-        ).fetchone()["count"]
+            "SELECT COUNT(*) FROM sessions WHERE is_revoked = 0 AND expires_at > ?",
+            (int(time.time()),)
+        ).fetchone()[0]
         
-        active_users = conn.execute("""
+        cursor = conn.execute("""
             SELECT id, username, email, rate_limit, is_admin, created_at, last_login
             FROM users WHERE is_active = 1
-        """).fetchall()
+        """)
+        # Nomes das colunas uma vez; linhas como tuplas (sem sqlite3.Row por linha)
+        columns = [d[0] for d in cursor.description]
+        active_users = [dict(zip(columns, row)) for row in cursor.fetchall()]
     
     return {
         "active_sessions": active_sessions,
-        "active_users": [dict(user) for user in active_users],
-        "admin": admin_user.get("username", admin_user.get("name"))
+        "active_users": active_users,
+        "admin": _admin_label(admin_user)
     }
 
 @app.post("/admin/generate-api-key")
@@ -871,30 +1340,7 @@ def generate_api_key(
 ):
     """Gera nova API key (apenas admin)"""
     try:
-        permissions_list = [p.strip() for p in permissions.split(",")]
-        created_by = admin_user.get("user_id") if admin_user["type"] == "jwt" else None
-        
-        api_key = db_manager.create_api_key(
-            name=name,
-            permissions=permissions_list,
-            rate_limit=rate_limit,
-            expires_days=expires_days,
-            created_by=created_by
-        )
-        
-        return {
-            "message": f"API key '{name}' created successfully",
-            "api_key": api_key,
-            "name": name,
-            "permissions": permissions_list,
-            "rate_limit": rate_limit,
-            "expires_days": expires_days,
-            "created_by": admin_user.get("username", admin_user.get("name")),
-            "usage": {
-                "header": "X-API-Key",
-                "example": f"curl -H 'X-API-Key: {api_key}' https://your-api.com/speak"
-            }
-        }
+        return _create_api_key_response(name, permissions, rate_limit, expires_days, admin_user)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -911,7 +1357,7 @@ def create_user(
 ):
     """Cria novo usuário (apenas admin)"""
     try:
-        permissions_list = [p.strip() for p in permissions.split(",")]
+        permissions_list = list(parse_permissions_csv(permissions))
         
         user_id = db_manager.create_user(
             username=username,
@@ -925,7 +1371,7 @@ def create_user(
         return {
             "message": f"User {username} created successfully",
             "user_id": user_id,
-            "created_by": admin_user.get("username", admin_user.get("name"))
+            "created_by": _admin_label(admin_user)
         }
         
     except Exception as e:
@@ -942,30 +1388,7 @@ def create_api_key(
 ):
     """Cria nova API key (apenas admin)"""
     try:
-        permissions_list = [p.strip() for p in permissions.split(",")]
-        created_by = admin_user.get("user_id") if admin_user["type"] == "jwt" else None
-        
-        api_key = db_manager.create_api_key(
-            name=name,
-            permissions=permissions_list,
-            rate_limit=rate_limit,
-            expires_days=expires_days,
-            created_by=created_by
-        )
-        
-        return {
-            "message": f"API key '{name}' created successfully",
-            "api_key": api_key,
-            "name": name,
-            "permissions": permissions_list,
-            "rate_limit": rate_limit,
-            "expires_days": expires_days,
-            "created_by": admin_user.get("username", admin_user.get("name")),
-            "usage": {
-                "header": "X-API-Key",
-                "example": f"curl -H 'X-API-Key: {api_key}' https://your-api.com/speak"
-            }
-        }
+        return _create_api_key_response(name, permissions, rate_limit, expires_days, admin_user)
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -992,7 +1415,7 @@ def initialize_default_data_route(admin_user: dict = Depends(get_admin_user)):
         
         return {
             "message": "Default data initialization completed",
-            "initiated_by": admin_user.get("username", admin_user.get("name")),
+            "initiated_by": _admin_label(admin_user),
             "results": result
         }
         
@@ -1000,30 +1423,51 @@ def initialize_default_data_route(admin_user: dict = Depends(get_admin_user)):
         logger.error(f"Error initializing default data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Cache curto do /admin/system-info (painel consultado em polling); a versão de
+# db_manager.stats_version invalida na hora ao criar/revogar usuários e keys
+SYSTEM_INFO_TTL = float(os.getenv("SYSTEM_INFO_TTL", "10"))
+_system_info_cache = None  # (versão, criado_em, payload)
+_system_info_lock = threading.Lock()
+
 @app.get("/admin/system-info")
 def get_system_info(admin_user: dict = Depends(get_admin_user)):
     """Informações do sistema (apenas admin)"""
-    with db_manager.get_connection() as conn:
-        # Estatísticas de usuários
-        users_count = conn.execute("SELECT COUNT(*) as count FROM users").fetchone()["count"]
-        active_users = conn.execute("SELECT COUNT(*) as count FROM users WHERE is_active = 1").fetchone()["count"]
-        
-        # Estatísticas de API keys
-        api_keys_count = conn.execute("SELECT COUNT(*) as count FROM api_keys").fetchone()["count"]
-        active_keys = conn.execute("SELECT COUNT(*) as count FROM api_keys WHERE is_active = 1").fetchone()["count"]
-        
-        # Estatísticas de sessões
-        active_sessions = conn.execute("SELECT COUNT(*) as count FROM sessions WHERE is_revoked = 0 AND expires_at > CURRENT_TIMESTAMP").fetchone()["count"]
+    global _system_info_cache
+    entry = _system_info_cache
+    if entry and entry[0] == db_manager.stats_version and time.monotonic() - entry[1] < SYSTEM_INFO_TTL:
+        return entry[2]
+    with _system_info_lock:
+        entry = _system_info_cache
+        if entry and entry[0] == db_manager.stats_version and time.monotonic() - entry[1] < SYSTEM_INFO_TTL:
+            return entry[2]
+        version = db_manager.stats_version
+        payload = build_system_info()
+        _system_info_cache = (version, time.monotonic(), payload)
+        return payload
+
+def build_system_info():
+    """Estatísticas do banco e configuração para /admin/system-info"""
+    with db_manager.get_connection(row_factory=sqlite3.Row) as conn:
+        # Estatísticas de usuários, API keys e sessões em uma única consulta
+        stats = conn.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM users) AS users_total,
+                (SELECT COUNT(*) FROM users WHERE is_active = 1) AS users_active,
+                (SELECT COUNT(*) FROM api_keys) AS keys_total,
+                (SELECT COUNT(*) FROM api_keys WHERE is_active = 1) AS keys_active,
+                (SELECT COUNT(*) FROM sessions WHERE is_revoked = 0 AND expires_at > ?) AS sessions_active
+        """, (int(time.time()),)).fetchone()
         
-        # Logs recentes
+        # Logs recentes (corte calculado aqui: range em idx_audit_ts_action)
+        cutoff = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - 86400))
         recent_logs = conn.execute("""
             SELECT action, COUNT(*) as count 
             FROM audit_logs 
-            WHERE timestamp > datetime('now', '-24 hours')
+            WHERE timestamp > ?
             GROUP BY action
             ORDER BY count DESC
             LIMIT 10
-        """).fetchall()
+        """, (cutoff,)).fetchall()
     
     return {
         "database": {
@@ -1032,9 +1476,9 @@ def get_system_info(admin_user: dict = Depends(get_admin_user)):
             "size_mb": round(os.path.getsize(db_manager.db_path) / (1024*1024), 2) if os.path.exists(db_manager.db_path) else 0
         },
         "statistics": {
-            "users": {"total": users_count, "active": active_users},
-            "api_keys": {"total": api_keys_count, "active": active_keys},
-            "active_sessions": active_sessions
+            "users": {"total": stats["users_total"], "active": stats["users_active"]},
+            "api_keys": {"total": stats["keys_total"], "active": stats["keys_active"]},
+            "active_sessions": stats["sessions_active"]
         },
         "recent_activity": [{"action": log["action"], "count": log["count"]} for log in recent_logs],
         "configuration": {
@@ -1050,12 +1494,7 @@ def revoke_api_key(
     admin_user: dict = Depends(get_admin_user)
 ):
     """Revoga API key (apenas admin)"""
-    with db_manager.get_connection() as conn:
-        conn.execute(
-            "UPDATE api_keys SET is_active = 0 WHERE id = ?",
-            (key_id,)
-        )
-        conn.commit()
+    db_manager.revoke_api_key(key_id)
     
     return {"message": f"API key {key_id} revoked"}
 
@@ -1067,7 +1506,7 @@ def get_cache_stats(admin_user: dict = Depends(get_admin_user)):
         "cache_stats": stats,
         "max_size_mb": 100,
         "usage_percentage": round((stats['total_size_mb'] / 100) * 100, 2) if stats['total_size_mb'] else 0,
-        "admin": admin_user.get("username", admin_user.get("name"))
+        "admin": _admin_label(admin_user)
     }
 
 @app.post("/admin/cache/cleanup")
@@ -1077,34 +1516,37 @@ def force_cache_cleanup(admin_user: dict = Depends(get_admin_user)):
     return {
         "message": "Cache cleanup executed",
         "result": result,
-        "admin": admin_user.get("username", admin_user.get("name"))
+        "admin": _admin_label(admin_user)
     }
 
+# Threads para remover os arquivos ao limpar o cache
+CACHE_UNLINK_WORKERS = 8
+
+def _remove_cache_file(file_path: str) -> bool:
+    """Remove um arquivo do cache; retorna False se não existia ou falhou"""
+    try:
+        os.unlink(file_path)
+        return True
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        logger.error(f"Error removing {file_path}: {e}")
+        return False
+
 @app.delete("/admin/cache/clear")
 def clear_all_cache(admin_user: dict = Depends(get_admin_user)):
     """Limpa todo o cache (apenas admin)"""
     try:
-        with db_manager.get_connection() as conn:
-            # Buscar todos os arquivos
-            entries = conn.execute('SELECT file_path FROM tts_cache').fetchall()
-            
-            removed_count = 0
-            for entry in entries:
-                if os.path.exists(entry['file_path']):
-                    try:
-                        os.remove(entry['file_path'])
-                        removed_count += 1
-                    except Exception as e:
-                        logger.error(f"Error removing {entry['file_path']}: {e}")
-            
-            # Limpar tabela
-            conn.execute('DELETE FROM tts_cache')
-            conn.commit()
+        # Limpar tabela (e cache em memória) numa transação e depois remover os
+        # arquivos em paralelo (unlinks independentes, limitados pelo disco)
+        file_paths = db_manager.clear_cache()
+        with ThreadPoolExecutor(max_workers=CACHE_UNLINK_WORKERS) as executor:
+            removed_count = sum(executor.map(_remove_cache_file, file_paths))
         
         return {
             "message": "All cache cleared",
             "files_removed": removed_count,
-            "admin": admin_user.get("username", admin_user.get("name"))
+            "admin": _admin_label(admin_user)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1113,69 +1555,47 @@ def clear_all_cache(admin_user: dict = Depends(get_admin_user)):
 def get_loaded_models(admin_user: dict = Depends(get_admin_user)):
     """Lista modelos carregados em memória (apenas admin)"""
     loaded = []
-    for key, wrapper in models.items():
-        model_info = MODEL_CONFIG.get(key, {})
+    now = time.time()
+    # models já está em ordem LRU: do mais recente ao mais antigo, sem ordenar
+    for key, wrapper in reversed(list(models.items())):
+        model_info = MODEL_INFO_FLAT[key]
         loaded.append({
             "key": key,
-            "name": model_info.get("name", key),
+            "name": model_info["name"],
             "usage_count": wrapper.usage_count,
-            "last_used_seconds_ago": int(time.time() - wrapper.last_used),
-            "languages": list(model_info.get("supported_languages", {}).keys())
+            "last_used_seconds_ago": int(now - wrapper.last_used),
+            "languages": model_info["languages"]
         })
     
-    # Ordenar por uso
-    loaded.sort(key=lambda x: x["usage_count"], reverse=True)
-    
     return {
         "loaded_models": loaded,
         "total_loaded": len(loaded),
         "max_models": MAX_LOADED_MODELS,
-        "available_models": list(MODEL_CONFIG.keys()),
-        "admin": admin_user.get("username", admin_user.get("name"))
+        "available_models": AVAILABLE_MODELS,
+        "admin": _admin_label(admin_user)
     }
 
 @app.post("/admin/models/unload/{model_key}")
 def unload_model(model_key: str, admin_user: dict = Depends(get_admin_user)):
     """Descarrega modelo específico da memória (apenas admin)"""
-    if model_key not in models:
+    wrapper = models.pop(model_key, None)
+    if wrapper is None:
         raise HTTPException(status_code=404, detail=f"Model '{model_key}' not loaded")
     
-    wrapper = models[model_key]
     usage_info = {
         "usage_count": wrapper.usage_count,
         "last_used_seconds_ago": int(time.time() - wrapper.last_used)
     }
     
-    del models[model_key]
-    
-    # Liberar memória
-    if has_cuda:
-        torch.cuda.empty_cache()
-    import gc
-    gc.collect()
+    # Liberar memória (descarregamento explícito pelo admin)
+    release_memory()
     
     return {
         "message": f"Model '{model_key}' unloaded",
         "usage_info": usage_info,
-        "admin": admin_user.get("username", admin_user.get("name"))
+        "admin": _admin_label(admin_user)
     }
 
-def cleanup_old_temp_files():
-    """Remove arquivos temporários antigos (> 1 hora)"""
-    temp_dir = os.path.join(os.getcwd(), "temp")
-    if not os.path.exists(temp_dir):
-        return
-    
-    now = time.time()
-    for filename in os.listdir(temp_dir):
-        filepath = os.path.join(temp_dir, filename)
-        if os.path.getmtime(filepath) < now - 3600:  # 1 hora
-            try:
-                os.remove(filepath)
-                logger.info(f"Removed old temp file: {filename}")
-            except Exception as e:
-                logger.error(f"Error removing {filename}: {e}")
-
 def cleanup_cache_if_needed():
     """Verifica e limpa cache se ultrapassar 100MB"""
     try:
@@ -1185,11 +1605,45 @@ def cleanup_cache_if_needed():
     except Exception as e:
         logger.error(f"Error during cache cleanup: {e}")
 
+def cleanup_rate_limits():
+    """Remove contadores de rate limit de janelas encerradas"""
+    try:
+        removed = db_manager.cleanup_rate_limits()
+        if removed:
+            logger.info(f"Rate limit cleanup: removed {removed} expired counters")
+    except Exception as e:
+        logger.error(f"Error during rate limit cleanup: {e}")
+
+def database_maintenance():
+    """Vacuum incremental do SQLite (fora do caminho das requisições)"""
+    try:
+        db_manager.vacuum_tick()
+    except Exception as e:
+        logger.error(f"Error during database vacuum: {e}")
+
+def database_optimize():
+    """Atualiza estatísticas do planner do SQLite"""
+    try:
+        db_manager.optimize()
+    except Exception as e:
+        logger.error(f"Error during database optimize: {e}")
+
 # Agendar limpeza a cada 30 minutos
 scheduler = BackgroundScheduler()
-scheduler.add_job(cleanup_old_temp_files, 'interval', minutes=30)
 scheduler.add_job(cleanup_cache_if_needed, 'interval', minutes=30)
-scheduler.start()
+scheduler.add_job(cleanup_rate_limits, 'interval', minutes=5)
+scheduler.add_job(database_maintenance, 'interval', minutes=30)
+scheduler.add_job(database_optimize, 'interval', hours=24)
+
+@app.on_event("startup")
+def start_scheduler():
+    if not scheduler.running:
+        scheduler.start()
+
+@app.on_event("shutdown")
+def stop_scheduler():
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
 
 # Manter o código existente para desenvolvimento local
 if __name__ == "__main__":
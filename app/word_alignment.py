@@ -20,8 +20,8 @@ import re
 import threading
 from typing import List, Dict, Optional, Tuple
 from difflib import SequenceMatcher
+import numpy as np
 from pydub import AudioSegment
-from pydub.effects import normalize as normalize_audio
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +33,9 @@ WHISPER_MODEL = os.getenv("WHISPER_MODEL", "small")           # small (VPS) ou m
 WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")           # cpu (VPS) ou cuda (Local)
 WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")  # int8 (VPS) ou float16 (Local)
 
+# Pico alvo da normalização em float [-1, 1] (headroom de 0.1 dB, como no pydub)
+NORMALIZE_PEAK = 10 ** (-0.1 / 20)
+
 # Global model instance (inicializado no startup da aplicação)
 _whisper_model = None
 _model_lock = threading.Lock()  # Thread-safety para inicialização
@@ -148,20 +151,23 @@ def get_whisper_model():
     return _whisper_model
 
 
-def preprocess_audio(audio_path: str) -> str:
+def preprocess_audio(audio_path: str):
     """
     Pré-processa áudio para melhorar acurácia da transcrição Whisper.
     
     Otimizações:
-    1. Normaliza volume (evita áudio muito baixo/alto)
-    2. Converte para mono (Whisper prefere mono)
-    3. Resample para 16kHz (padrão Whisper)
+    1. Converte para mono (Whisper prefere mono)
+    2. Resample para 16kHz (padrão Whisper)
+    3. Normaliza volume (evita áudio muito baixo/alto)
+    
+    O resultado fica em memória (float32 em [-1, 1]), que o faster-whisper
+    aceita diretamente - sem WAV temporário em disco.
     
     Args:
         audio_path: Caminho do arquivo MP3/WAV original
     
     Returns:
-        Caminho do arquivo WAV normalizado (temp)
+        np.ndarray float32 mono 16kHz, ou o caminho original em caso de falha
     """
     try:
         logger.debug(f"Preprocessing audio: {os.path.basename(audio_path)}")
@@ -169,30 +175,26 @@ def preprocess_audio(audio_path: str) -> str:
         # Carregar áudio
         audio = AudioSegment.from_file(audio_path)
         
-        # 1. Normalizar volume (boost para áudio baixo)
-        audio = normalize_audio(audio)
-        
-        # 2. Converter para mono se estéreo
+        # 1. Converter para mono se estéreo
         if audio.channels > 1:
             audio = audio.set_channels(1)
             logger.debug("  - Converted to mono")
         
-        # 3. Resample para 16kHz (padrão Whisper)
+        # 2. Resample para 16kHz (padrão Whisper)
         if audio.frame_rate != 16000:
             audio = audio.set_frame_rate(16000)
             logger.debug(f"  - Resampled: {audio.frame_rate}Hz -> 16000Hz")
         
-        # Salvar como WAV temporário
-        temp_dir = os.path.join(os.getcwd(), "temp")
-        os.makedirs(temp_dir, exist_ok=True)
+        # 3. Normalizar volume + int16 -> float32 numa única passada
+        # (mesmo headroom de 0.1 dB do pydub.effects.normalize)
+        audio = audio.set_sample_width(2)
+        pcm = np.frombuffer(audio.raw_data, dtype=np.int16)
+        peak = max(int(pcm.max()), -int(pcm.min())) if pcm.size else 0
+        scale = NORMALIZE_PEAK / peak if peak else 1.0 / 32768.0
+        samples = np.multiply(pcm, np.float32(scale), dtype=np.float32)
+        logger.debug(f"  - Prepared {len(samples)} samples in memory")
         
-        base_name = os.path.splitext(os.path.basename(audio_path))[0]
-        temp_path = os.path.join(temp_dir, f"{base_name}_normalized.wav")
-        
-        audio.export(temp_path, format='wav')
-        logger.debug(f"  - Saved normalized: {os.path.basename(temp_path)}")
-        
-        return temp_path
+        return samples
         
     except Exception as e:
         logger.warning(f"Audio preprocessing failed: {e}, using original")
@@ -382,14 +384,14 @@ def align_words(audio_path: str, text: str, lang: str) -> list:
         
         logger.info(f"🎯 Starting word alignment (Anchor-Based): {os.path.basename(audio_path)}")
         
-        preprocessed_path = preprocess_audio(audio_path)
+        audio_input = preprocess_audio(audio_path)
         
         # Usar início do texto como prompt para guiar o Whisper
         prompt_text = text[:200].strip() if text else ("תנ״ך" if lang == "heb" else None)
 
         # Transcrever com word-level timestamps
         segments, info = model.transcribe(
-            preprocessed_path,
+            audio_input,
             language=whisper_lang,
             word_timestamps=True,
             vad_filter=True,
@@ -402,12 +404,6 @@ def align_words(audio_path: str, text: str, lang: str) -> list:
             initial_prompt=prompt_text
         )
         
-        if preprocessed_path != audio_path and os.path.exists(preprocessed_path):
-            try:
-                os.remove(preprocessed_path)
-            except Exception:
-                pass
-        
         # Extrair palavras com timestamps (Flat list)
         word_segments = []
         for segment in segments: